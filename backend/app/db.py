@@ -1,36 +1,77 @@
 """MongoDB connection and book cache. Disabled when MONGODB_URI is not set."""
+import asyncio
+import logging
 import os
-from datetime import date, datetime, time
+from calendar import monthrange
+from collections import OrderedDict
+from collections.abc import AsyncIterator
+from datetime import date, datetime, time, timedelta, timezone
+from time import monotonic
+from zoneinfo import ZoneInfo
+
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import PyMongoError
 
 from app.models import BookResponse, BookUpdate
 
+logger = logging.getLogger(__name__)
+
 MONGODB_URI = os.environ.get("MONGODB_URI", "").strip()
 COLLECTION_NAME = "books"
+PROGRESS_COLLECTION_NAME = "progress_events"  # one doc per page update: {isbn, date, delta}
 
 # Timezone for "today" and stats (e.g. America/Chicago for Central Time). Default UTC.
 APP_TIMEZONE = os.environ.get("APP_TIMEZONE", "UTC").strip() or "UTC"
-
-
-def _app_tz():
-    from zoneinfo import ZoneInfo
-    return ZoneInfo(APP_TIMEZONE)
+_APP_TZ = ZoneInfo(APP_TIMEZONE)
 
 
 def get_app_today() -> date:
     """Today's date in the app timezone (APP_TIMEZONE env)."""
-    return datetime.now(_app_tz()).date()
+    return datetime.now(_APP_TZ).date()
 
 
 def get_app_now() -> datetime:
     """Current datetime in the app timezone (for date logic like 'this month')."""
-    return datetime.now(_app_tz())
+    return datetime.now(_APP_TZ)
+
+
+# One Motor client (and its connection pool) per event loop, created on first use.
+# Motor binds a client to the loop it runs on, so the cache is keyed by loop.
+_clients: dict[asyncio.AbstractEventLoop, object] = {}
+
+# Keep a few connections open so requests after idle skip the TCP/TLS handshake,
+# and fail fast when the server is unreachable instead of waiting the 30s default.
+_CLIENT_OPTIONS = {
+    "minPoolSize": 5,
+    "maxPoolSize": 50,
+    "maxIdleTimeMS": 60_000,
+    "serverSelectionTimeoutMS": 3_000,
+    "retryWrites": True,
+    # Wire compression, negotiated with the server at handshake (zstd needs the zstandard package)
+    "compressors": "zstd,zlib",
+    "zlibCompressionLevel": 6,
+}
 
 
 def _client():
     if not MONGODB_URI:
         return None
-    from motor.motor_asyncio import AsyncIOMotorClient
-    return AsyncIOMotorClient(MONGODB_URI)
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        client = AsyncIOMotorClient(MONGODB_URI, io_loop=loop, **_CLIENT_OPTIONS)
+        _clients[loop] = client
+    return client
+
+
+def shutdown() -> None:
+    """Close all cached Motor clients (call on app shutdown)."""
+    for client in _clients.values():
+        client.close()
+    _clients.clear()
+    _collections.clear()
+    _invalidate_overrides_cache()
 
 
 def is_db_enabled() -> bool:
@@ -38,40 +79,159 @@ def is_db_enabled() -> bool:
     return bool(MONGODB_URI)
 
 
-def _get_collection():
-    if not MONGODB_URI:
-        return None
-    client = _client()
-    if not client:
-        return None
-    return client["booklog"][COLLECTION_NAME]
+# Collection handles derived from the cached clients, keyed by (loop, collection name)
+_collections: dict[tuple[asyncio.AbstractEventLoop, str], object] = {}
 
 
-def _get_settings_collection():
+def _cached_collection(name: str):
     if not MONGODB_URI:
         return None
+    key = (asyncio.get_running_loop(), name)
+    coll = _collections.get(key)
+    if coll is None:
+        coll = _client()["booklog"][name]
+        _collections[key] = coll
+    return coll
+
+
+def _get_collection():
+    return _cached_collection(COLLECTION_NAME)
+
+
+def _get_progress_collection():
+    return _cached_collection(PROGRESS_COLLECTION_NAME)
+
+
+_indexes_ready = False
+
+
+async def ensure_indexes() -> None:
+    """Create indexes backing the isbn lookup, the status/sort list queries and the activity-date scans (once per process)."""
+    global _indexes_ready
+    coll = _get_collection()
+    if coll is None or _indexes_ready:
+        return
+    progress = _get_progress_collection()
+    await asyncio.gather(
+        coll.create_index([("isbn", 1)], unique=True),
+        coll.create_index([("status", 1), ("backlog_order", 1)]),
+        coll.create_index([("status", 1), ("finished_date", -1)]),
+        coll.create_index([("status", 1), ("last_looked_up", -1)]),
+        coll.create_index([("last_looked_up", -1)]),
+        # One index per activity field: each $or branch of the date filters can then use its own index
+        coll.create_index([("started_date", 1)], sparse=True),
+        coll.create_index([("finished_date", 1)], sparse=True),
+        coll.create_index([("last_progress_date", 1)], sparse=True),
+        progress.create_index([("date", 1)]),
+        progress.create_index([("isbn", 1)]),
+    )
+    _indexes_ready = True
+
+
+async def startup() -> None:
+    """Create the client, warm its connection pool, ensure indexes and migrate embedded progress events
+    (call on app startup). A MongoDB outage only logs a warning so the API still starts; queries fail per
+    request as before, and the progress migration is retried by the first stats/month-summary request."""
     client = _client()
-    if not client:
-        return None
-    return client["booklog"]["settings"]
+    if client is None:
+        return
+    try:
+        await client.admin.command("ping")
+        await ensure_indexes()
+    except PyMongoError as e:
+        logger.warning("MongoDB startup checks failed: %s", e)
+    try:
+        await ensure_progress_events_migrated()
+    except PyMongoError as e:
+        logger.warning("Progress event migration failed (will retry on next stats read): %s", e)
+
+
+_progress_migrated = False
+
 
+async def ensure_progress_events_migrated() -> None:
+    """Run _migrate_embedded_progress_events until it succeeds once per process.
+    Stats read page progress only from the progress_events collection, so they call this first."""
+    global _progress_migrated
+    if _progress_migrated:
+        return
+    await _migrate_embedded_progress_events()
+    _progress_migrated = True
 
-def _normalize_date(doc: dict, key: str) -> None:
-    """Convert datetime to date in place for key if present."""
-    if doc.get(key) and hasattr(doc[key], "date"):
-        doc[key] = doc[key].date()
+
+async def _migrate_embedded_progress_events() -> None:
+    """Move progress_events arrays embedded in book docs (older layout) into the progress_events collection.
+    Idempotent: events get deterministic _ids and are only inserted if missing."""
+    coll = _get_collection()
+    progress = _get_progress_collection()
+    if coll is None or progress is None:
+        return
+    cursor = coll.find({"progress_events.0": {"$exists": True}}, projection={"isbn": 1, "progress_events": 1})
+    async for doc in cursor:
+        ops = []
+        for i, ev in enumerate(doc["progress_events"]):
+            ed, delta = ev.get("date"), ev.get("delta")
+            if isinstance(ed, str):
+                try:
+                    ed = datetime.fromisoformat(ed[:10])
+                except ValueError:
+                    continue
+            if not isinstance(ed, datetime) or not isinstance(delta, int) or not delta:
+                continue
+            # Deterministic _id so an interrupted migration can be re-run without duplicating events
+            ops.append(UpdateOne(
+                {"_id": f"{doc['isbn']}:{i}"},
+                {"$setOnInsert": {"isbn": doc["isbn"], "date": ed, "delta": delta}},
+                upsert=True,
+            ))
+        if ops:
+            await progress.bulk_write(ops, ordered=False)
+        await coll.update_one({"_id": doc["_id"]}, {"$unset": {"progress_events": ""}})
+
+
+def _get_settings_collection():
+    return _cached_collection("settings")
 
 
 _DATE_KEYS = ("finished_date", "started_date", "backlog_date", "last_progress_date")
+_ACTIVITY_KEYS = ("started_date", "finished_date", "last_progress_date")  # dates that mark a calendar day as read
+_MIDNIGHT = time(0, 0)
+
+
+def _date_to_datetime(d: date) -> datetime:
+    return datetime.combine(d, _MIDNIGHT)
+
+
+def _coerce_dates(payload: dict) -> dict:
+    """Return a copy of payload with date values under _DATE_KEYS as midnight datetimes (BSON has no date-only type)."""
+    out = dict(payload)
+    for key in _DATE_KEYS:
+        val = out.get(key)
+        if isinstance(val, date) and not isinstance(val, datetime):
+            out[key] = datetime.combine(val, _MIDNIGHT)
+    return out
+
+
+# Only fetch fields that BookResponse exposes (skips _id and any not-yet-migrated embedded progress_events)
+_BOOK_PROJECTION = {"_id": 0, **dict.fromkeys(BookResponse.model_fields, 1)}
 
 
 def _doc_to_book(doc: dict) -> BookResponse:
-    doc = dict(doc)
+    """Build a BookResponse from a stored doc. Mutates doc (Motor returns a fresh dict per row).
+    Skips Pydantic validation, so date fields are normalized here: older rows may hold ISO strings."""
     doc.pop("_id", None)
-    doc.pop("progress_events", None)  # internal, not in API response
+    doc.pop("progress_events", None)  # legacy embedded log, not in API response
+    # Mongo stores dates as datetimes; the API exposes them as dates
     for key in _DATE_KEYS:
-        _normalize_date(doc, key)
-    return BookResponse(**doc)
+        val = doc.get(key)
+        if type(val) is datetime:
+            doc[key] = val.date()
+        elif isinstance(val, str):
+            try:
+                doc[key] = date.fromisoformat(val[:10])
+            except ValueError:
+                doc[key] = None
+    return BookResponse.model_construct(**doc)
 
 
 async def get_book_by_isbn(isbn: str) -> BookResponse | None:
@@ -79,18 +239,42 @@ async def get_book_by_isbn(isbn: str) -> BookResponse | None:
     coll = _get_collection()
     if coll is None:
         return None
-    doc = await coll.find_one({"isbn": isbn})
+    doc = await coll.find_one({"isbn": isbn}, projection=_BOOK_PROJECTION)
     if not doc:
         return None
     return _doc_to_book(doc)
 
 
+# Cache hits within this window of the last write skip the touch. LRU of isbn -> monotonic time of last write.
+_TOUCH_DEBOUNCE_SECONDS = 3600.0
+_TOUCH_CACHE_SIZE = 4096
+_last_touched: OrderedDict[str, float] = OrderedDict()
+
+
+def _recently_touched(isbn: str) -> bool:
+    """True if last_looked_up for isbn was written within the debounce window."""
+    touched = _last_touched.get(isbn)
+    return touched is not None and monotonic() - touched < _TOUCH_DEBOUNCE_SECONDS
+
+
+def _mark_touched(isbn: str) -> None:
+    """Record that last_looked_up for isbn was just written (evicts the least recent entry when full)."""
+    _last_touched[isbn] = monotonic()
+    _last_touched.move_to_end(isbn)
+    if len(_last_touched) > _TOUCH_CACHE_SIZE:
+        _last_touched.popitem(last=False)
+
+
 async def delete_book(isbn: str) -> bool:
     """Delete the book/article document. Removes it from Read, backlog, in progress, and history. Returns True if deleted."""
     coll = _get_collection()
     if coll is None:
         return False
-    result = await coll.delete_one({"isbn": isbn})
+    result, _ = await asyncio.gather(
+        coll.delete_one({"isbn": isbn}),
+        _get_progress_collection().delete_many({"isbn": isbn}),
+    )
+    _last_touched.pop(isbn, None)
     return result.deleted_count > 0
 
 
@@ -105,7 +289,7 @@ async def save_book(book: BookResponse) -> None:
     coll = _get_collection()
     if coll is None:
         return
-    now = datetime.utcnow()
+    now = datetime.now(timezone.utc)
     payload = book.model_dump()
     payload["last_looked_up"] = now
     await coll.update_one(
@@ -113,6 +297,7 @@ async def save_book(book: BookResponse) -> None:
         {"$set": payload},
         upsert=True,
     )
+    _mark_touched(book.isbn)
 
 
 async def save_book_metadata(book: BookResponse) -> None:
@@ -122,62 +307,157 @@ async def save_book_metadata(book: BookResponse) -> None:
         return
     raw = book.model_dump()
     payload = {k: raw[k] for k in METADATA_FIELDS if k in raw}
-    payload["last_looked_up"] = datetime.utcnow()
+    payload["last_looked_up"] = datetime.now(timezone.utc)
     await coll.update_one(
         {"isbn": book.isbn},
         {"$set": payload},
         upsert=True,
     )
+    _mark_touched(book.isbn)
 
 
 async def touch_book_last_looked_up(isbn: str) -> None:
-    """Set last_looked_up to now for an existing document (after serving from cache)."""
+    """Set last_looked_up to now for an existing document (after serving from cache).
+    Skipped when it was refreshed within the last hour: in process via the debounce map, and
+    server-side by the filter so other workers' recent touches aren't rewritten either."""
     coll = _get_collection()
     if coll is None:
         return
+    if _recently_touched(isbn):
+        return
+    _mark_touched(isbn)
+    now = datetime.now(timezone.utc)
+    cutoff = now - timedelta(seconds=_TOUCH_DEBOUNCE_SECONDS)
     await coll.update_one(
-        {"isbn": isbn},
-        {"$set": {"last_looked_up": datetime.utcnow()}},
+        {"isbn": isbn, "last_looked_up": {"$not": {"$gte": cutoff}}},
+        {"$set": {"last_looked_up": now}},
     )
 
 
-async def get_history(limit: int = 20) -> list[BookResponse]:
-    """Return recent lookups ordered by last_looked_up descending."""
+# List queries. Each has a streaming iter_* form (yields as the cursor fetches batches,
+# for callers that write rows out as they arrive) and a get_* form returning a list.
+_LIST_BATCH_SIZE = 100
+
+
+def _history_cursor(limit: int):
     coll = _get_collection()
     if coll is None:
-        return []
-    cursor = coll.find({}).sort("last_looked_up", -1).limit(limit)
-    out = []
-    async for doc in cursor:
-        out.append(_doc_to_book(doc))
-    return out
+        return None
+    cursor = coll.find({}, projection=_BOOK_PROJECTION).sort("last_looked_up", -1).limit(limit)
+    if limit > 0:
+        cursor = cursor.batch_size(limit)  # whole page in the first batch
+    return cursor
 
 
-async def get_backlog() -> list[BookResponse]:
-    """Return books with status=backlog ordered by backlog_order."""
+def _status_cursor(status: str, sort_key: str, direction: int):
     coll = _get_collection()
     if coll is None:
+        return None
+    return (
+        coll.find({"status": status}, projection=_BOOK_PROJECTION)
+        .sort(sort_key, direction)
+        .batch_size(_LIST_BATCH_SIZE)
+    )
+
+
+async def _iter_books(cursor) -> AsyncIterator[BookResponse]:
+    if cursor is None:
+        return
+    async for doc in cursor:
+        yield _doc_to_book(doc)
+
+
+async def _list_books(cursor) -> list[BookResponse]:
+    if cursor is None:
         return []
-    cursor = coll.find({"status": "backlog"}).sort("backlog_order", 1)
-    return [_doc_to_book(d) async for d in cursor]
+    return [_doc_to_book(d) for d in await cursor.to_list(length=None)]
+
+
+def iter_history(limit: int = 20) -> AsyncIterator[BookResponse]:
+    """Stream recent lookups ordered by last_looked_up descending."""
+    return _iter_books(_history_cursor(limit))
+
+
+async def get_history(limit: int = 20) -> list[BookResponse]:
+    """Return recent lookups ordered by last_looked_up descending."""
+    return await _list_books(_history_cursor(limit))
+
+
+def iter_backlog() -> AsyncIterator[BookResponse]:
+    """Stream books with status=backlog ordered by backlog_order."""
+    return _iter_books(_status_cursor("backlog", "backlog_order", 1))
+
+
+async def get_backlog() -> list[BookResponse]:
+    """Return books with status=backlog ordered by backlog_order."""
+    return await _list_books(_status_cursor("backlog", "backlog_order", 1))
+
+
+def iter_in_progress() -> AsyncIterator[BookResponse]:
+    """Stream books with status=in_progress ordered by last_looked_up desc."""
+    return _iter_books(_status_cursor("in_progress", "last_looked_up", -1))
 
 
 async def get_in_progress() -> list[BookResponse]:
     """Return books with status=in_progress ordered by last_looked_up desc."""
-    coll = _get_collection()
-    if coll is None:
-        return []
-    cursor = coll.find({"status": "in_progress"}).sort("last_looked_up", -1)
-    return [_doc_to_book(d) async for d in cursor]
+    return await _list_books(_status_cursor("in_progress", "last_looked_up", -1))
+
+
+def iter_finished() -> AsyncIterator[BookResponse]:
+    """Stream books with status=finished ordered by finished_date desc."""
+    return _iter_books(_status_cursor("finished", "finished_date", -1))
 
 
 async def get_finished() -> list[BookResponse]:
     """Return books with status=finished ordered by finished_date desc."""
-    coll = _get_collection()
-    if coll is None:
-        return []
-    cursor = coll.find({"status": "finished"}).sort("finished_date", -1)
-    return [_doc_to_book(d) async for d in cursor]
+    return await _list_books(_status_cursor("finished", "finished_date", -1))
+
+
+async def get_dashboard(history_limit: int = 20) -> dict:
+    """Return history, backlog, in-progress, finished and stats together. The queries are independent, so they run concurrently."""
+    history, backlog, in_progress, finished, stats = await asyncio.gather(
+        get_history(limit=history_limit),
+        get_backlog(),
+        get_in_progress(),
+        get_finished(),
+        get_stats(),
+    )
+    return {
+        "history": history,
+        "backlog": backlog,
+        "in_progress": in_progress,
+        "finished": finished,
+        "stats": stats,
+    }
+
+
+async def _next_backlog_order(coll) -> int:
+    """Reserve the next backlog_order from a counter doc in settings ($inc is atomic, so concurrent adds never collide)."""
+    settings = _get_settings_collection()
+    doc = await settings.find_one_and_update(
+        {"_id": "backlog_counter"},
+        {"$inc": {"seq": 1}},
+        return_document=ReturnDocument.AFTER,
+    )
+    if doc is None:
+        # First use: seed the counter from the current backlog so existing items keep their order
+        top = await coll.find_one(
+            {"status": "backlog"},
+            sort=[("backlog_order", -1)],
+            projection={"backlog_order": 1},
+        )
+        last = top.get("backlog_order") if top else None
+        await settings.update_one(
+            {"_id": "backlog_counter"},
+            {"$max": {"seq": last if isinstance(last, int) else -1}},
+            upsert=True,
+        )
+        doc = await settings.find_one_and_update(
+            {"_id": "backlog_counter"},
+            {"$inc": {"seq": 1}},
+            return_document=ReturnDocument.AFTER,
+        )
+    return doc["seq"]
 
 
 async def add_to_backlog(isbn: str, book_payload: dict) -> BookResponse | None:
@@ -185,13 +465,8 @@ async def add_to_backlog(isbn: str, book_payload: dict) -> BookResponse | None:
     coll = _get_collection()
     if coll is None:
         return None
-    agg = await coll.find_one(
-        {"status": "backlog"},
-        sort=[("backlog_order", -1)],
-        projection={"backlog_order": 1},
-    )
-    next_order = (agg["backlog_order"] + 1) if agg else 0
-    now = datetime.utcnow()
+    next_order = await _next_backlog_order(coll)
+    now = datetime.now(timezone.utc)
     today = get_app_today()
     payload = {
         **book_payload,
@@ -201,12 +476,9 @@ async def add_to_backlog(isbn: str, book_payload: dict) -> BookResponse | None:
         "backlog_date": today,
         "last_looked_up": now,
     }
-    # MongoDB BSON doesn't support datetime.date; convert date fields to datetime
-    for key in _DATE_KEYS:
-        if key in payload and payload[key] is not None and hasattr(payload[key], "year"):
-            payload[key] = _date_to_datetime(payload[key])
-    await coll.update_one({"isbn": isbn}, {"$set": payload}, upsert=True)
-    return _doc_to_book(payload)
+    await coll.update_one({"isbn": isbn}, {"$set": _coerce_dates(payload)}, upsert=True)
+    # payload still holds plain dates, so it is already in response shape
+    return BookResponse.model_construct(**payload)
 
 
 async def create_article(article: BookResponse) -> BookResponse | None:
@@ -214,39 +486,29 @@ async def create_article(article: BookResponse) -> BookResponse | None:
     coll = _get_collection()
     if coll is None:
         return None
-    now = datetime.utcnow()
+    now = datetime.now(timezone.utc)
     today = get_app_today()
     payload = article.model_dump()
     payload["last_looked_up"] = now
     if payload.get("status") == "backlog":
-        agg = await coll.find_one(
-            {"status": "backlog"},
-            sort=[("backlog_order", -1)],
-            projection={"backlog_order": 1},
-        )
-        next_order = (agg["backlog_order"] + 1) if agg else 0
-        payload["backlog_order"] = next_order
+        payload["backlog_order"] = await _next_backlog_order(coll)
         payload["backlog_date"] = today
     elif payload.get("status") == "in_progress" and not payload.get("started_date"):
         payload["started_date"] = today
-    for key in ("finished_date", "started_date", "backlog_date"):
-        if key in payload and payload[key] is not None and hasattr(payload[key], "year"):
-            payload[key] = _date_to_datetime(payload[key])
-    await coll.insert_one(payload)
-    return _doc_to_book(payload)
+    await coll.insert_one(_coerce_dates(payload))
+    return BookResponse.model_construct(**payload)
 
 
 async def reorder_backlog(isbns: list[str]) -> None:
-    """Set backlog_order by index in isbns list."""
+    """Set backlog_order by index in isbns list (one bulk write)."""
     coll = _get_collection()
-    if coll is None:
+    if coll is None or not isbns:
         return
-    for i, isbn in enumerate(isbns):
-        await coll.update_one({"isbn": isbn, "status": "backlog"}, {"$set": {"backlog_order": i}})
-
-
-def _date_to_datetime(d: date) -> datetime:
-    return datetime.combine(d, datetime.min.time())
+    ops = [
+        UpdateOne({"isbn": isbn, "status": "backlog"}, {"$set": {"backlog_order": i}})
+        for i, isbn in enumerate(isbns)
+    ]
+    await coll.bulk_write(ops, ordered=False)
 
 
 async def update_book(isbn: str, update: BookUpdate) -> BookResponse | None:
@@ -256,33 +518,38 @@ async def update_book(isbn: str, update: BookUpdate) -> BookResponse | None:
         return None
     payload = update.model_dump(exclude_unset=True)
     if not payload:
-        doc = await coll.find_one({"isbn": isbn})
+        doc = await coll.find_one({"isbn": isbn}, projection=_BOOK_PROJECTION)
         return _doc_to_book(doc) if doc else None
-    # When moving to in_progress, set started_date to today if not already set and not provided (app timezone)
-    if payload.get("status") == "in_progress" and "started_date" not in payload:
-        doc = await coll.find_one({"isbn": isbn}, projection={"started_date": 1})
-        if doc and doc.get("started_date") is None:
-            payload["started_date"] = get_app_today()
-    # When user updates page number, record that day as progress activity and log delta for "pages recorded" stats
-    progress_delta = None
+    today = get_app_today()
+    today_dt = _date_to_datetime(today)
+    # When user updates page number, record that day as progress activity
     if "current_page" in payload:
-        payload["last_progress_date"] = get_app_today()
-        old_doc = await coll.find_one({"isbn": isbn}, projection={"current_page": 1})
-        old_page = (old_doc.get("current_page") or 0) if old_doc else 0
-        new_page = payload["current_page"]
-        if isinstance(new_page, int) and new_page != old_page:
-            progress_delta = new_page - old_page
-    # Convert date fields for MongoDB
-    for key in _DATE_KEYS:
-        if key in payload and payload[key] is not None:
-            payload[key] = _date_to_datetime(payload[key])
-    update_op: dict = {"$set": payload}
-    if progress_delta is not None:
-        today_dt = _date_to_datetime(get_app_today())
-        update_op["$push"] = {"progress_events": {"date": today_dt, "delta": progress_delta}}
-    await coll.update_one({"isbn": isbn}, update_op)
-    doc = await coll.find_one({"isbn": isbn})
-    return _doc_to_book(doc) if doc else None
+        payload["last_progress_date"] = today
+    payload = _coerce_dates(payload)
+    # Pipeline update so defaults can read the stored doc; $literal keeps values like "$5" from being field paths
+    stage = {key: {"$literal": value} for key, value in payload.items()}
+    # When moving to in_progress, keep an existing started_date, otherwise default to today (app timezone)
+    default_started = payload.get("status") == "in_progress" and "started_date" not in payload
+    if default_started:
+        stage["started_date"] = {"$ifNull": ["$started_date", today_dt]}
+    # One round trip: take the pre-update doc (needed for the page delta) and apply the same $set locally
+    before = await coll.find_one_and_update(
+        {"isbn": isbn},
+        [{"$set": stage}],
+        projection=_BOOK_PROJECTION,
+        return_document=ReturnDocument.BEFORE,
+    )
+    if before is None:
+        return None
+    doc = {**before, **payload}
+    if default_started and before.get("started_date") is None:
+        doc["started_date"] = today_dt
+    # Log the page delta for "pages recorded" stats
+    new_page = payload.get("current_page")
+    old_page = before.get("current_page") or 0
+    if isinstance(new_page, int) and new_page != old_page:
+        await _get_progress_collection().insert_one({"isbn": isbn, "date": today_dt, "delta": new_page - old_page})
+    return _doc_to_book(doc)
 
 
 async def get_stats(as_of_date: date | None = None) -> dict:
@@ -291,60 +558,58 @@ async def get_stats(as_of_date: date | None = None) -> dict:
     coll = _get_collection()
     if coll is None:
         return {"pages_this_month": 0, "pages_this_year": 0, "books_finished_count": 0, "items_finished_count": 0}
+    await ensure_progress_events_migrated()
     if as_of_date is not None:
         start_of_month = date(as_of_date.year, as_of_date.month, 1)
         start_of_year = date(as_of_date.year, 1, 1)
-        from calendar import monthrange
         end_of_month = date(as_of_date.year, as_of_date.month, monthrange(as_of_date.year, as_of_date.month)[1])
         end_of_year = date(as_of_date.year, 12, 31)
     else:
         now = get_app_now()
         start_of_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0).date()
         start_of_year = now.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0).date()
-        from calendar import monthrange
         end_of_month = date(now.year, now.month, monthrange(now.year, now.month)[1])
         end_of_year = date(now.year, 12, 31)
-    finished = await coll.find({"status": "finished"}).to_list(length=None)
-    items_count = len(finished)
-    books_finished_count = sum(1 for doc in finished if not doc.get("entry_type") or doc.get("entry_type") == "book")
-    articles_finished_count = sum(1 for doc in finished if doc.get("entry_type") == "article")
-    poems_finished_count = sum(1 for doc in finished if doc.get("entry_type") == "poem")
-    pages_from_finished_month = 0
-    pages_from_finished_year = 0
-    for doc in finished:
-        fd = doc.get("finished_date")
-        num_pages = doc.get("number_of_pages") or 0
-        if not isinstance(num_pages, int):
-            continue
-        if fd is None:
-            continue
-        fd_date = fd.date() if hasattr(fd, "date") else fd
-        if fd_date >= start_of_month:
-            pages_from_finished_month += num_pages
-        if fd_date >= start_of_year:
-            pages_from_finished_year += num_pages
-
+    pages = {"$cond": [{"$in": [{"$type": "$number_of_pages"}, ["int", "long"]]}, "$number_of_pages", 0]}
+    finished_pipeline = [
+        {"$match": {"status": "finished"}},
+        {"$group": {
+            "_id": None,
+            "items": {"$sum": 1},
+            "books": {"$sum": {"$cond": [{"$in": [{"$ifNull": ["$entry_type", ""]}, ["", "book"]]}, 1, 0]}},
+            "articles": {"$sum": {"$cond": [{"$eq": ["$entry_type", "article"]}, 1, 0]}},
+            "poems": {"$sum": {"$cond": [{"$eq": ["$entry_type", "poem"]}, 1, 0]}},
+            "pages_month": {"$sum": {"$cond": [{"$gte": ["$finished_date", _date_to_datetime(start_of_month)]}, pages, 0]}},
+            "pages_year": {"$sum": {"$cond": [{"$gte": ["$finished_date", _date_to_datetime(start_of_year)]}, pages, 0]}},
+        }},
+    ]
     # Pages recorded this month/year (from progress updates, any page delta logged in that period)
-    pages_recorded_month = 0
-    pages_recorded_year = 0
-    cursor = coll.find({"progress_events": {"$exists": True, "$ne": []}}, projection={"progress_events": 1})
-    async for doc in cursor:
-        for ev in doc.get("progress_events") or []:
-            ed = ev.get("date")
-            delta = ev.get("delta") or 0
-            if not isinstance(delta, int):
-                continue
-            ed_date = ed.date() if hasattr(ed, "date") else (ed[:10] if isinstance(ed, str) else None)
-            if ed_date is None:
-                continue
-            if hasattr(ed_date, "isoformat"):
-                ed_str = ed_date.isoformat()
-            else:
-                ed_str = str(ed_date)[:10]
-            if start_of_month.isoformat() <= ed_str <= end_of_month.isoformat():
-                pages_recorded_month += delta
-            if start_of_year.isoformat() <= ed_str <= end_of_year.isoformat():
-                pages_recorded_year += delta
+    month_start_dt = _date_to_datetime(start_of_month)
+    month_end_dt = datetime.combine(end_of_month, time.max)
+    recorded_pipeline = [
+        {"$match": {"date": {"$gte": _date_to_datetime(start_of_year), "$lte": datetime.combine(end_of_year, time.max)}}},
+        {"$group": {
+            "_id": None,
+            "year": {"$sum": "$delta"},
+            "month": {"$sum": {"$cond": [{"$and": [
+                {"$gte": ["$date", month_start_dt]}, {"$lte": ["$date", month_end_dt]},
+            ]}, "$delta", 0]}},
+        }},
+    ]
+    finished_rows, recorded_rows = await asyncio.gather(
+        coll.aggregate(finished_pipeline).to_list(length=1),
+        _get_progress_collection().aggregate(recorded_pipeline).to_list(length=1),
+    )
+    finished = finished_rows[0] if finished_rows else {}
+    recorded = recorded_rows[0] if recorded_rows else {}
+    items_count = finished.get("items", 0)
+    books_finished_count = finished.get("books", 0)
+    articles_finished_count = finished.get("articles", 0)
+    poems_finished_count = finished.get("poems", 0)
+    pages_from_finished_month = finished.get("pages_month", 0)
+    pages_from_finished_year = finished.get("pages_year", 0)
+    pages_recorded_month = recorded.get("month", 0)
+    pages_recorded_year = recorded.get("year", 0)
 
     return {
         "pages_this_month": pages_from_finished_month,
@@ -360,53 +625,54 @@ async def get_stats(as_of_date: date | None = None) -> dict:
     }
 
 
-def _doc_date_to_iso(val) -> str | None:
-    """Get YYYY-MM-DD string from a doc value (datetime or str), or None."""
-    if val is None:
-        return None
-    if hasattr(val, "date"):
-        return val.date().isoformat()
-    if isinstance(val, str) and len(val) >= 10:
-        return val[:10]
-    return None
-
-
 async def _clear_future_activity_dates() -> None:
     """Remove any started_date, finished_date, or last_progress_date that is in the future (app timezone).
     So tomorrow won't show as 'read' until the user actually logs reading that day."""
     coll = _get_collection()
     if coll is None:
         return
-    today_str = get_app_today().isoformat()
-    cursor = coll.find(
-        {
-            "$or": [
-                {"started_date": {"$exists": True, "$ne": None}},
-                {"finished_date": {"$exists": True, "$ne": None}},
-                {"last_progress_date": {"$exists": True, "$ne": None}},
-            ]
-        },
-        projection={"isbn": 1, "started_date": 1, "finished_date": 1, "last_progress_date": 1},
+    today = get_app_today()
+    today_end = datetime.combine(today, time.max)
+    tomorrow_str = (today + timedelta(days=1)).isoformat()
+
+    def is_future(key: str) -> dict:
+        # Datetimes compare natively against the end of today; legacy YYYY-MM-DD strings by prefix order
+        return {"$or": [
+            {"$gt": [f"${key}", today_end]},
+            {"$and": [{"$eq": [{"$type": f"${key}"}, "string"]}, {"$gte": [f"${key}", tomorrow_str]}]},
+        ]}
+
+    # One server-side update: the filter only matches docs with a future date,
+    # and $$REMOVE drops just the offending fields
+    await coll.update_many(
+        {"$or": [
+            clause
+            for key in _ACTIVITY_KEYS
+            for clause in ({key: {"$gt": today_end}}, {key: {"$gte": tomorrow_str}})
+        ]},
+        [{"$set": {key: {"$cond": [is_future(key), "$$REMOVE", f"${key}"]} for key in _ACTIVITY_KEYS}}],
     )
-    async for doc in cursor:
-        unset: dict[str, str] = {}
-        for key in ("started_date", "finished_date", "last_progress_date"):
-            date_str = _doc_date_to_iso(doc.get(key))
-            if date_str is not None and date_str > today_str:
-                unset[key] = ""
-        if unset:
-            await coll.update_one({"isbn": doc["isbn"]}, {"$unset": unset})
+
+
+# Keep the last overrides read in memory. set_calendar_override invalidates it for this worker;
+# the TTL bounds how long other workers keep serving their stale copy.
+_OVERRIDES_TTL_SECONDS = 30.0
+_overrides_cache: dict[str, bool] | None = None
+_overrides_cached_at = 0.0
 
 
 async def get_calendar_overrides() -> dict[str, bool]:
     """Return manual calendar overrides: date_str -> True (show) or False (hide). Overrides have final say in UI."""
+    global _overrides_cache, _overrides_cached_at
+    if _overrides_cache is not None and monotonic() - _overrides_cached_at < _OVERRIDES_TTL_SECONDS:
+        return dict(_overrides_cache)
     settings = _get_settings_collection()
     if settings is None:
         return {}
     doc = await settings.find_one({"_id": "calendar_overrides"})
-    if not doc or "overrides" not in doc:
-        return {}
-    return dict(doc["overrides"])
+    _overrides_cache = dict(doc["overrides"]) if doc and "overrides" in doc else {}
+    _overrides_cached_at = monotonic()
+    return dict(_overrides_cache)
 
 
 async def set_calendar_override(date_str: str, show: bool | None) -> None:
@@ -429,6 +695,53 @@ async def set_calendar_override(date_str: str, show: bool | None) -> None:
             {"$set": {f"overrides.{date_str}": show}},
             upsert=True,
         )
+    _invalidate_overrides_cache()
+
+
+def _invalidate_overrides_cache() -> None:
+    global _overrides_cache
+    _overrides_cache = None
+
+
+def _date_str_expr(field: str) -> dict:
+    """Aggregation expression giving YYYY-MM-DD for a stored date (datetime or string), else null."""
+    return {"$switch": {
+        "branches": [
+            {"case": {"$eq": [{"$type": f"${field}"}, "date"]},
+             "then": {"$dateToString": {"format": "%Y-%m-%d", "date": f"${field}"}}},
+            {"case": {"$and": [
+                {"$eq": [{"$type": f"${field}"}, "string"]},
+                {"$gte": [{"$strLenCP": f"${field}"}, 10]},
+            ]},
+             "then": {"$substrCP": [f"${field}", 0, 10]}},
+        ],
+        "default": None,
+    }}
+
+
+def _activity_days_pipeline(day_filter: dict) -> list[dict]:
+    """Aggregation yielding distinct {_id: YYYY-MM-DD} days with activity (started, finished, or progress) matching day_filter.
+    Stored dates are midnight UTC for the local day, so they are formatted in UTC (no timezone shift)."""
+    return [
+        {"$match": {
+            "$or": [
+                {"started_date": {"$exists": True, "$ne": None}},
+                {"finished_date": {"$exists": True, "$ne": None}},
+                {"last_progress_date": {"$exists": True, "$ne": None}},
+            ]
+        }},
+        {"$project": {"_id": 0, "d": [
+            _date_str_expr("started_date"),
+            _date_str_expr("finished_date"),
+            _date_str_expr("last_progress_date"),
+        ]}},
+        {"$unwind": "$d"},
+        {"$match": {"d": day_filter}},
+        {"$group": {"_id": "$d"}},
+    ]
+
+
+_ACTIVITY_BATCH_SIZE = 10_000  # ~27 years of distinct days
 
 
 async def get_reading_activity_dates() -> list[str]:
@@ -438,33 +751,10 @@ async def get_reading_activity_dates() -> list[str]:
         computed: set[str] = set()
     else:
         await _clear_future_activity_dates()
-        computed = set()
-        today = get_app_today()
-        today_str = today.isoformat()
-        cursor = coll.find(
-            {
-                "$or": [
-                    {"started_date": {"$exists": True, "$ne": None}},
-                    {"finished_date": {"$exists": True, "$ne": None}},
-                    {"last_progress_date": {"$exists": True, "$ne": None}},
-                ]
-            },
-            projection={"started_date": 1, "finished_date": 1, "last_progress_date": 1},
-        )
-        async for doc in cursor:
-            for key in ("started_date", "finished_date", "last_progress_date"):
-                val = doc.get(key)
-                if val is None:
-                    continue
-                d = val.date() if hasattr(val, "date") else val
-                if hasattr(d, "isoformat"):
-                    date_str = d.isoformat()
-                    if date_str <= today_str:
-                        computed.add(date_str)
-                elif isinstance(d, str) and len(d) >= 10:
-                    date_str = d[:10]
-                    if date_str <= today_str:
-                        computed.add(date_str)
+        today_str = get_app_today().isoformat()
+        pipeline = _activity_days_pipeline({"$lte": today_str})
+        # Rows are tiny day strings; a large first batch returns them all in one round trip
+        computed = {row["_id"] async for row in coll.aggregate(pipeline, batchSize=_ACTIVITY_BATCH_SIZE)}
 
     overrides = await get_calendar_overrides()
     result = set(computed)
@@ -483,68 +773,53 @@ async def get_month_summary(year: int, month: int) -> dict:
     coll = _get_collection()
     if coll is None:
         return {"pages_read": 0, "items_finished": [], "dates": []}
-    from calendar import monthrange
+    await ensure_progress_events_migrated()
     start_day = date(year, month, 1)
     last_day = monthrange(year, month)[1]
     end_day = date(year, month, last_day)
     start_str = start_day.isoformat()
     end_str = end_day.isoformat()
 
-    # Items finished in this month (finished_date within month range)
-    end_of_day = datetime.combine(end_day, time(23, 59, 59, 999999))
-    cursor = coll.find({
-        "status": "finished",
-        "finished_date": {"$gte": _date_to_datetime(start_day), "$lte": end_of_day},
-    })
-    items_finished = [_doc_to_book(d) async for d in cursor]
+    month_start_dt = _date_to_datetime(start_day)
+    end_of_day = datetime.combine(end_day, time.max)
+    next_month_str = (end_day + timedelta(days=1)).isoformat()
+    # One pass over the books: only docs with some activity date in the month can contribute
+    # (each $or branch can use its date index), then $facet splits finished items from activity days
+    pipeline = [
+        {"$match": {"$or": [
+            clause
+            for key in _ACTIVITY_KEYS
+            for clause in (
+                {key: {"$gte": month_start_dt, "$lte": end_of_day}},
+                {key: {"$gte": start_str, "$lt": next_month_str}},
+            )
+        ]}},
+        {"$facet": {
+            # Items finished in this month (finished_date within month range)
+            "finished": [
+                {"$match": {"status": "finished", "finished_date": {"$gte": month_start_dt, "$lte": end_of_day}}},
+                {"$project": _BOOK_PROJECTION},
+            ],
+            # Activity dates in this month (started, finished, or progress)
+            "dates": _activity_days_pipeline({"$gte": start_str, "$lte": end_str}),
+        }},
+    ]
+    # Pages recorded this month (progress update deltas) come from the events collection, fetched concurrently
+    recorded_pipeline = [
+        {"$match": {"date": {"$gte": month_start_dt, "$lte": end_of_day}}},
+        {"$group": {"_id": None, "pages": {"$sum": "$delta"}}},
+    ]
+    (facet,), recorded = await asyncio.gather(
+        coll.aggregate(pipeline).to_list(length=1),
+        _get_progress_collection().aggregate(recorded_pipeline).to_list(length=1),
+    )
+    items_finished = [_doc_to_book(d) for d in facet["finished"]]
     pages_read = sum(
         (doc.number_of_pages or 0) for doc in items_finished
         if isinstance(doc.number_of_pages, int)
     )
-
-    # Activity dates in this month (started, finished, or progress)
-    dates_in_month: set[str] = set()
-    cursor = coll.find(
-        {
-            "$or": [
-                {"started_date": {"$exists": True, "$ne": None}},
-                {"finished_date": {"$exists": True, "$ne": None}},
-                {"last_progress_date": {"$exists": True, "$ne": None}},
-            ]
-        },
-        projection={"started_date": 1, "finished_date": 1, "last_progress_date": 1},
-    )
-    async for doc in cursor:
-        for key in ("started_date", "finished_date", "last_progress_date"):
-            val = doc.get(key)
-            if val is None:
-                continue
-            d = val.date() if hasattr(val, "date") else val
-            if hasattr(d, "isoformat"):
-                date_str = d.isoformat()
-            elif isinstance(d, str) and len(d) >= 10:
-                date_str = d[:10]
-            else:
-                continue
-            if start_str <= date_str <= end_str:
-                dates_in_month.add(date_str)
-
-    # Pages recorded this month (progress update deltas)
-    pages_recorded = 0
-    cursor = coll.find({"progress_events": {"$exists": True, "$ne": []}}, projection={"progress_events": 1})
-    async for doc in cursor:
-        for ev in doc.get("progress_events") or []:
-            ed = ev.get("date")
-            delta = ev.get("delta") or 0
-            if not isinstance(delta, int):
-                continue
-            ed_date = ed.date() if hasattr(ed, "date") else None
-            if ed_date is None and isinstance(ed, str):
-                ed_date = ed[:10]
-            if ed_date is not None:
-                ed_str = ed_date.isoformat() if hasattr(ed_date, "isoformat") else str(ed_date)[:10]
-                if start_str <= ed_str <= end_str:
-                    pages_recorded += delta
+    dates_in_month = {row["_id"] for row in facet["dates"]}
+    pages_recorded = recorded[0]["pages"] if recorded else 0
 
     return {
         "pages_read": pages_read,
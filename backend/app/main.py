@@ -1,14 +1,48 @@
+import asyncio
+import logging
 import os
-import uuid
+import re
+import secrets
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, HTTPException
+from cachetools import TTLCache
+from fastapi import BackgroundTasks, Depends, FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 import httpx
+import orjson
+from pydantic import TypeAdapter
 
 from app import db
 from app.models import AddToBacklogBody, BookResponse, BookUpdate, BacklogOrderUpdate, CalendarOverrideBody, CreateArticleBody
 
-app = FastAPI(title="Book Log API")
+
+logger = logging.getLogger(__name__)
+
+_HTTP_HEADERS = {"User-Agent": "BookLog/1.0 (https://github.com/your-org/books)"}
+# Keep connections to Google Books / Open Library warm across requests instead of a TLS handshake per lookup
+_HTTP_LIMITS = httpx.Limits(max_keepalive_connections=50, max_connections=200, keepalive_expiry=30.0)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm the MongoDB client and ensure indexes on startup; open the shared HTTP client.
+    Both connection pools are released on shutdown."""
+    await db.startup()
+    # HTTP/2 multiplexes concurrent Google Books / Open Library requests over one connection per host;
+    # httpx already advertises every compression it can decode (gzip/deflate, zstd via zstandard)
+    app.state.http = httpx.AsyncClient(
+        follow_redirects=True, headers=_HTTP_HEADERS, limits=_HTTP_LIMITS, http2=True,
+    )
+    try:
+        yield
+    finally:
+        await app.state.http.aclose()
+        db.shutdown()
+
+
+app = FastAPI(title="Book Log API", lifespan=lifespan, default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -19,9 +53,25 @@ app.add_middleware(
 )
 
 
+# Recently served ISBN lookups (serialized JSON bytes); repeat hits skip the Mongo round trip and encoding.
+# Routes that modify a book drop its entry, so only the last_looked_up debounce can be stale.
+_book_cache: TTLCache = TTLCache(maxsize=4096, ttl=300)
+
+
+def get_http_client(request: Request) -> httpx.AsyncClient:
+    """Shared outbound HTTP client opened in lifespan."""
+    return request.app.state.http
+
+
+_ISBN_DEL = str.maketrans("", "", " -")
+_ISBN_RE = re.compile(r"\d{10}(?:\d{3})?$")  # ISBN-10 or ISBN-13, digits only
+
+
 def normalize_isbn(isbn: str) -> str:
     """Strip spaces and dashes from ISBN."""
-    return isbn.replace(" ", "").replace("-", "").strip()
+    if " " not in isbn and "-" not in isbn:
+        return isbn.strip()  # already normalized (the usual case from the frontend)
+    return isbn.translate(_ISBN_DEL).strip()
 
 
 def _extract_description(desc):
@@ -40,80 +90,61 @@ async def _fetch_open_library_page_count(client: httpx.AsyncClient, isbn: str) -
     resp = await client.get(f"https://openlibrary.org/isbn/{isbn}.json")
     if resp.status_code != 200:
         return None
-    return resp.json().get("number_of_pages") or None
+    pages = resp.json().get("number_of_pages")
+    return pages if isinstance(pages, int) and pages > 0 else None
+
+
+# Fetch Open Library page counts speculatively alongside Google Books (HEDGE_EXTERNAL_LOOKUPS=0 disables)
+HEDGE_EXTERNAL_LOOKUPS = os.environ.get("HEDGE_EXTERNAL_LOOKUPS", "1").strip() != "0"
+
+
+def _httpsify(url: str | None) -> str | None:
+    """Upgrade an http: URL (Google Books thumbnails) to https:; anything else is returned as is."""
+    if url and url.startswith("http:"):
+        return "https:" + url[5:]
+    return url
 
 
 def _book_from_google_books(item: dict, isbn: str) -> dict:
-    """Build our response dict from Google Books volume item."""
+    """Build our response dict (the unified response shape) from Google Books volume item in one pass."""
     vi = item.get("volumeInfo") or {}
-    authors = vi.get("authors") or []
     publisher = vi.get("publisher")
-    publishers = [publisher] if publisher else []
     image_links = vi.get("imageLinks") or {}
-    thumbnail = image_links.get("thumbnail") or image_links.get("smallThumbnail")
-    if thumbnail and thumbnail.startswith("http:"):
-        thumbnail = "https:" + thumbnail[5:]
-    categories = vi.get("categories") or []
+    thumbnail = _httpsify(image_links.get("thumbnail") or image_links.get("smallThumbnail"))
     page_count = vi.get("pageCount")
     if page_count is not None and not isinstance(page_count, int):
         page_count = None
+    description = vi.get("description")
+    if isinstance(description, str):
+        description = description.strip() or description
 
-    return _normalize_book_response(
-        isbn=isbn,
-        title=vi.get("title", "Unknown"),
-        authors=authors,
-        publishers=publishers,
-        publish_date=vi.get("publishedDate"),
-        number_of_pages=page_count,
-        cover_url=thumbnail,
-        subjects=categories,
-        description=vi.get("description"),
-    )
-
-
-def _normalize_book_response(
-    *,
-    isbn: str,
-    title: str,
-    authors: list,
-    publishers: list,
-    publish_date,
-    number_of_pages,
-    cover_url,
-    subjects: list,
-    description,
-) -> dict:
-    """Normalize fields into the unified response shape."""
+    # Lists come straight from the freshly parsed JSON, so they are used without copying
     return {
         "isbn": isbn,
-        "title": title or "Unknown",
-        "authors": list(authors) if authors else ["Unknown"],
-        "publishers": list(publishers) if publishers else [],
-        "publish_date": publish_date,
-        "number_of_pages": number_of_pages,
-        "cover_url": cover_url,
-        "subjects": list(subjects) if subjects else [],
-        "description": description.strip() if isinstance(description, str) and description.strip() else (description or None),
+        "title": vi.get("title") or "Unknown",
+        "authors": vi.get("authors") or ["Unknown"],
+        "publishers": [publisher] if publisher else [],
+        "publish_date": vi.get("publishedDate"),
+        "number_of_pages": page_count,
+        "cover_url": thumbnail,
+        "subjects": vi.get("categories") or [],
+        "description": description or None,
     }
 
 
+# API key is fixed for the process lifetime (avoids blocking when set); read it once at import
+GOOGLE_BOOKS_API_KEY = os.environ.get("GOOGLE_BOOKS_API_KEY", "").strip()
+_GB_KEY_SUFFIX = f"&key={GOOGLE_BOOKS_API_KEY}" if GOOGLE_BOOKS_API_KEY else ""
+
 
 def _google_books_url(isbn: str) -> str:
-    """Google Books volumes URL for this ISBN. Uses API key from env if set (avoids blocking)."""
-    url = f"https://www.googleapis.com/books/v1/volumes?q=isbn:{isbn}"
-    key = os.environ.get("GOOGLE_BOOKS_API_KEY", "").strip()
-    if key:
-        url = f"{url}&key={key}"
-    return url
+    """Google Books volumes URL for this ISBN (already validated as digits)."""
+    return f"https://www.googleapis.com/books/v1/volumes?q=isbn:{isbn}{_GB_KEY_SUFFIX}"
 
 
 def _google_books_search_url(q: str, max_results: int = 10) -> str:
     """Google Books volumes URL for a free-text query."""
-    url = f"https://www.googleapis.com/books/v1/volumes?q={q}&maxResults={max_results}"
-    key = os.environ.get("GOOGLE_BOOKS_API_KEY", "").strip()
-    if key:
-        url = f"{url}&key={key}"
-    return url
+    return f"https://www.googleapis.com/books/v1/volumes?q={q}&maxResults={max_results}{_GB_KEY_SUFFIX}"
 
 
 def _isbn_from_google_item(vi: dict) -> str | None:
@@ -140,58 +171,112 @@ async def _fetch_google_books_by_isbn(client: httpx.AsyncClient, isbn: str) -> d
     )
 
 
+async def _fetch_book_remote(client: httpx.AsyncClient, isbn: str) -> dict:
+    """Fetch book metadata from Google Books, patching a missing page count from Open Library.
+    Raises HTTPException 404 when Google Books has no result."""
+    # Start the Open Library page-count request in parallel so a missing Google pageCount
+    # costs no extra round trip; it is cancelled once Google turns out to have the count
+    ol_task = None
+    if HEDGE_EXTERNAL_LOOKUPS:
+        ol_task = asyncio.create_task(_fetch_open_library_page_count(client, isbn))
+        ol_task.add_done_callback(lambda t: t.cancelled() or t.exception())  # errors only matter if awaited
+    try:
+        gb_item = await _fetch_google_books_by_isbn(client, isbn)
+        if gb_item is None:
+            raise HTTPException(status_code=404, detail="Book not found for this ISBN")
+
+        result = _book_from_google_books(gb_item, isbn)
+
+        # Patch missing page count from Open Library when Google Books reports 0 or None
+        if not result["number_of_pages"]:
+            ol_pages = await (ol_task or _fetch_open_library_page_count(client, isbn))
+            if ol_pages:
+                result["number_of_pages"] = ol_pages
+    finally:
+        if ol_task is not None:
+            ol_task.cancel()
+    return result
+
+
+_inflight: dict[str, asyncio.Task] = {}  # ISBN -> external lookup currently running
+_pending_saves: set[asyncio.Task] = set()  # strong refs so the event loop doesn't drop running saves
+
+
+def _finish_inflight(isbn: str, task: asyncio.Task) -> None:
+    """Drop a finished lookup from _inflight and save its result to MongoDB.
+    The save belongs to the lookup, not to whichever request started it, so it runs even if that
+    request was cancelled while others were still waiting on the result."""
+    _inflight.pop(isbn, None)
+    if task.cancelled() or task.exception() is not None or not db.is_db_enabled():
+        return
+    # result is built by _book_from_google_books in the response shape, so skip re-validation
+    save = asyncio.create_task(db.save_book_metadata(BookResponse.model_construct(**task.result())))
+    _pending_saves.add(save)
+    save.add_done_callback(_finish_save)
+
+
+def _finish_save(task: asyncio.Task) -> None:
+    _pending_saves.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("Saving book metadata failed: %s", task.exception())
+
+
 def _is_article_id(id_str: str) -> bool:
     """True if the identifier is an article/poem id (article-<uuid>)."""
-    return id_str.startswith("article-") and len(id_str) > 8
+    return len(id_str) > 8 and id_str.startswith("article-")
 
 
 @app.get("/api/books/isbn/{isbn}")
-async def get_book_by_isbn(isbn: str):
+async def get_book_by_isbn(
+    isbn: str,
+    background_tasks: BackgroundTasks,
+    client: httpx.AsyncClient = Depends(get_http_client),
+):
     """
     Look up a book by ISBN or an article by id (article-<uuid>).
-    For ISBN: checks MongoDB cache first; if found, returns cached data without calling
-    the external APIs. Otherwise fetches from Google Books (primary source) and patches
+    For ISBN: checks the in-process cache, then MongoDB; if found, returns cached data without
+    calling the external APIs. Otherwise fetches from Google Books (primary source) and patches
     the page count from Open Library when Google reports 0 or None. Metadata is saved
-    to MongoDB without overwriting user-specific reading data.
+    to MongoDB without overwriting user-specific reading data. Mongo writes don't hold up the
+    response.
     For article id: returns from DB only.
     """
     if _is_article_id(isbn):
         if db.is_db_enabled():
             cached = await db.get_book_by_isbn(isbn)
             if cached is not None:
-                return cached.model_dump(mode="json")
+                return ORJSONResponse(cached.model_dump())
         raise HTTPException(status_code=404, detail="Article not found")
     isbn = normalize_isbn(isbn)
-    if not isbn or not isbn.isdigit():
-        raise HTTPException(status_code=400, detail="Invalid ISBN: must contain only digits (and optional spaces/dashes)")
+    if not _ISBN_RE.match(isbn):
+        raise HTTPException(status_code=400, detail="Invalid ISBN: must be 10 or 13 digits (and optional spaces/dashes)")
 
     if db.is_db_enabled():
-        cached = await db.get_book_by_isbn(isbn)
-        if cached is not None:
-            await db.touch_book_last_looked_up(isbn)
-            return cached.model_dump(mode="json")
-
-    headers = {"User-Agent": "BookLog/1.0 (https://github.com/your-org/books)"}
-    async with httpx.AsyncClient(follow_redirects=True, headers=headers) as client:
-        gb_item = await _fetch_google_books_by_isbn(client, isbn)
-        if gb_item is None:
-            raise HTTPException(status_code=404, detail="Book not found for this ISBN")
-
-        result = _book_from_google_books(gb_item, isbn)
-
-        # Patch missing page count from Open Library when Google Books reports 0 or None
-        if not result["number_of_pages"]:
-            ol_pages = await _fetch_open_library_page_count(client, isbn)
-            if ol_pages:
-                result["number_of_pages"] = ol_pages
+        hit = _book_cache.get(isbn)
+        if hit is None:
+            cached = await db.get_book_by_isbn(isbn)
+            if cached is not None:
+                hit = _book_cache[isbn] = orjson.dumps(cached.model_dump())
+        if hit is not None:
+            background_tasks.add_task(db.touch_book_last_looked_up, isbn)
+            return Response(hit, media_type="application/json")
 
-        if db.is_db_enabled():
-            await db.save_book_metadata(BookResponse(**result))
-        return result
+    # Concurrent lookups of the same uncached ISBN share one external fetch; shield it so a
+    # disconnecting client doesn't cancel the fetch other requests are waiting on
+    task = _inflight.get(isbn)
+    if task is None:
+        task = asyncio.create_task(_fetch_book_remote(client, isbn))
+        _inflight[isbn] = task
+        task.add_done_callback(lambda t: _finish_inflight(isbn, t))
+    return await asyncio.shield(task)
 
 
 @app.get("/api/books/search")
-async def search_books(title: str | None = None, author: str | None = None):
+async def search_books(
+    title: str | None = None,
+    author: str | None = None,
+    client: httpx.AsyncClient = Depends(get_http_client),
+):
     """Search Google Books by title and/or author. Returns up to 10 results."""
     title = (title or "").strip()
     author = (author or "").strip()
@@ -205,33 +290,51 @@ async def search_books(title: str | None = None, author: str | None = None):
         parts.append(f"inauthor:{author}")
     q = "+".join(parts)
 
-    headers = {"User-Agent": "BookLog/1.0 (https://github.com/your-org/books)"}
-    async with httpx.AsyncClient(follow_redirects=True, headers=headers) as client:
-        url = _google_books_search_url(q)
-        resp = await client.get(url, timeout=15.0)
-        if resp.status_code != 200:
-            error_detail = (
-                resp.json().get("error", {}).get("message", resp.text)
-                if resp.content else resp.reason_phrase
-            )
-            raise HTTPException(
-                status_code=502,
-                detail=f"Google Books API error ({resp.status_code}): {error_detail}",
-            )
-        items = resp.json().get("items") or []
-        results = []
-        for item in items:
-            vi = item.get("volumeInfo") or {}
-            isbn = _isbn_from_google_item(vi) or ""
-            results.append(_book_from_google_books(item, isbn))
-        return results
+    url = _google_books_search_url(q)
+    resp = await client.get(url, timeout=15.0)
+    if resp.status_code != 200:
+        error_detail = (
+            resp.json().get("error", {}).get("message", resp.text)
+            if resp.content else resp.reason_phrase
+        )
+        raise HTTPException(
+            status_code=502,
+            detail=f"Google Books API error ({resp.status_code}): {error_detail}",
+        )
+    items = resp.json().get("items") or []
+    results = []
+    for item in items:
+        vi = item.get("volumeInfo") or {}
+        isbn = _isbn_from_google_item(vi) or ""
+        results.append(_book_from_google_books(item, isbn))
+    return results
+
+
+# Serializes a whole list of books in one pass instead of one model_dump dispatch per item
+_BOOK_LIST_ADAPTER = TypeAdapter(list[BookResponse])
+
+
+async def _encode_books(first: BookResponse, rest: AsyncIterator[BookResponse]) -> AsyncIterator[bytes]:
+    """Encode books as a JSON array, one document per chunk."""
+    yield b"[" + orjson.dumps(first.model_dump())
+    async for b in rest:
+        yield b"," + orjson.dumps(b.model_dump())
+    yield b"]"
+
+
+async def _stream_books(items: AsyncIterator[BookResponse]) -> Response:
+    """Stream a list endpoint straight from the Mongo cursor instead of building the whole list first.
+    The first row is read before the response starts, so query errors still surface as a normal error response."""
+    first = await anext(items, None)
+    if first is None:
+        return Response(b"[]", media_type="application/json")
+    return StreamingResponse(_encode_books(first, items), media_type="application/json")
 
 
 @app.get("/api/books/history")
 async def list_history(limit: int = 20):
     """Return recent book lookups (when MongoDB is enabled). Ordered by last lookup time."""
-    items = await db.get_history(limit=limit)
-    return [b.model_dump(mode="json") for b in items]
+    return await _stream_books(db.iter_history(limit=limit))
 
 
 # --- Reading log (backlog, in-progress, finished) - require MongoDB ---
@@ -239,8 +342,7 @@ async def list_history(limit: int = 20):
 @app.get("/api/books/backlog")
 async def list_backlog():
     """List books in backlog (ordered). Returns [] when DB disabled."""
-    items = await db.get_backlog()
-    return [b.model_dump(mode="json") for b in items]
+    return await _stream_books(db.iter_backlog())
 
 
 @app.post("/api/books/backlog")
@@ -255,9 +357,10 @@ async def add_to_backlog(body: AddToBacklogBody):
     if existing is None:
         raise HTTPException(status_code=404, detail="Book not found. Look it up by ISBN first.")
     book = await db.add_to_backlog(isbn, existing.model_dump())
+    _book_cache.pop(isbn, None)
     if book is None:
         raise HTTPException(status_code=503, detail="Database error")
-    return book.model_dump(mode="json")
+    return ORJSONResponse(book.model_dump())
 
 
 @app.put("/api/books/backlog/order")
@@ -274,21 +377,33 @@ async def reorder_backlog(body: BacklogOrderUpdate):
             if n:
                 isbns.append(n)
     await db.reorder_backlog(isbns)
+    _book_cache.clear()
     return {"ok": True}
 
 
 @app.get("/api/books/in-progress")
 async def list_in_progress():
     """List books currently in progress."""
-    items = await db.get_in_progress()
-    return [b.model_dump(mode="json") for b in items]
+    return await _stream_books(db.iter_in_progress())
 
 
 @app.get("/api/books/finished")
 async def list_finished():
     """List finished books (by finished date desc)."""
-    items = await db.get_finished()
-    return [b.model_dump(mode="json") for b in items]
+    return await _stream_books(db.iter_finished())
+
+
+@app.get("/api/dashboard")
+async def get_dashboard_route(limit: int = 20):
+    """History, backlog, in-progress, finished and stats in one response (fetched concurrently). limit applies to history."""
+    data = await db.get_dashboard(history_limit=limit)
+    return ORJSONResponse({
+        "history": _BOOK_LIST_ADAPTER.dump_python(data["history"]),
+        "backlog": _BOOK_LIST_ADAPTER.dump_python(data["backlog"]),
+        "in_progress": _BOOK_LIST_ADAPTER.dump_python(data["in_progress"]),
+        "finished": _BOOK_LIST_ADAPTER.dump_python(data["finished"]),
+        "stats": data["stats"],
+    })
 
 
 @app.patch("/api/books/{isbn}")
@@ -301,9 +416,10 @@ async def update_book(isbn: str, body: BookUpdate):
     if not db.is_db_enabled():
         raise HTTPException(status_code=503, detail="Database not configured")
     book = await db.update_book(isbn, body)
+    _book_cache.pop(isbn, None)
     if book is None:
         raise HTTPException(status_code=404, detail="Book or article not found")
-    return book.model_dump(mode="json")
+    return ORJSONResponse(book.model_dump())
 
 
 @app.delete("/api/books/{isbn}")
@@ -316,6 +432,7 @@ async def delete_book(isbn: str):
     if not db.is_db_enabled():
         raise HTTPException(status_code=503, detail="Database not configured")
     deleted = await db.delete_book(isbn)
+    _book_cache.pop(isbn, None)
     if not deleted:
         raise HTTPException(status_code=404, detail="Book or article not found")
     return {"ok": True}
@@ -326,7 +443,7 @@ async def create_article(body: CreateArticleBody):
     """Create an article or poem manually (title required). Stored with id article-<uuid>."""
     if not db.is_db_enabled():
         raise HTTPException(status_code=503, detail="Database not configured")
-    article_id = f"article-{uuid.uuid4().hex}"
+    article_id = "article-" + secrets.token_hex(16)  # same 32 hex chars as uuid4().hex
     entry_type = body.entry_type if body.entry_type in ("article", "poem") else "article"
     status = body.status or "backlog"
     today = db.get_app_today()
@@ -346,7 +463,7 @@ async def create_article(body: CreateArticleBody):
     created = await db.create_article(article)
     if created is None:
         raise HTTPException(status_code=503, detail="Database error")
-    return created.model_dump(mode="json")
+    return ORJSONResponse(created.model_dump())
 
 
 @app.get("/api/books/stats")
@@ -400,9 +517,9 @@ async def get_month_summary(year: int, month: int):
     if not (1 <= month <= 12):
         raise HTTPException(status_code=400, detail="month must be 1-12")
     data = await db.get_month_summary(year, month)
-    return {
+    return ORJSONResponse({
         "pages_read": data["pages_read"],
         "pages_recorded": data.get("pages_recorded", 0),
-        "items_finished": [b.model_dump(mode="json") for b in data["items_finished"]],
+        "items_finished": _BOOK_LIST_ADAPTER.dump_python(data["items_finished"]),
         "dates": data["dates"],
-    }
+    })
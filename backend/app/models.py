@@ -1,5 +1,5 @@
 """Pydantic models for book data and API responses."""
-from datetime import date, datetime
+from datetime import date, datetime, timezone
 from typing import Literal
 
 from pydantic import BaseModel, Field
@@ -34,7 +34,7 @@ class BookResponse(BaseModel):
 
 class BookDocument(BookResponse):
     """Book as stored in MongoDB (same as response + last_looked_up required for storage)."""
-    last_looked_up: datetime = Field(default_factory=datetime.utcnow)
+    last_looked_up: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 
 class BookUpdate(BaseModel):
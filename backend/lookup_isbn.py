@@ -2,26 +2,37 @@
 Quick ISBN lookup from Google Books API.
 
 Usage:
-    .venv/bin/python lookup_isbn.py 9780670016907
+    .venv/bin/python lookup_isbn.py 9780670016907 [9780143039433 ...]
     GOOGLE_BOOKS_API_KEY=... .venv/bin/python lookup_isbn.py 9780670016907
 """
-import json
 import os
 import sys
 
 import httpx
+import orjson
 
+_ISBN_STRIP = str.maketrans("", "", "- ")
 
-def lookup(isbn: str) -> None:
-    isbn = isbn.replace("-", "").replace(" ", "").strip()
+
+def _client() -> httpx.Client:
+    return httpx.Client(http2=True, timeout=15.0, follow_redirects=True)
+
+
+def lookup(isbn: str, client: httpx.Client | None = None) -> None:
+    """Print Google Books volumeInfo for an ISBN. Pass a client to reuse its connection across calls."""
+    isbn = isbn.translate(_ISBN_STRIP).strip()
     url = f"https://www.googleapis.com/books/v1/volumes?q=isbn:{isbn}"
     key = os.environ.get("GOOGLE_BOOKS_API_KEY", "").strip()
     if key:
         url = f"{url}&key={key}"
 
-    resp = httpx.get(url, timeout=15.0, follow_redirects=True)
+    if client is None:
+        with _client() as client:
+            resp = client.get(url)
+    else:
+        resp = client.get(url)
     resp.raise_for_status()
-    data = resp.json()
+    data = orjson.loads(resp.content)
 
     items = data.get("items") or []
     if not items:
@@ -29,11 +40,13 @@ def lookup(isbn: str) -> None:
         return
 
     vi = items[0].get("volumeInfo", {})
-    print(json.dumps(vi, indent=2, ensure_ascii=False))
+    print(orjson.dumps(vi, option=orjson.OPT_INDENT_2).decode())
 
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
-        print("Usage: python lookup_isbn.py <isbn>")
+        print("Usage: python lookup_isbn.py <isbn> [<isbn> ...]")
         sys.exit(1)
-    lookup(sys.argv[1])
+    with _client() as client:
+        for arg in sys.argv[1:]:
+            lookup(arg, client)
@@ -4,57 +4,52 @@ Quick ISBN lookup from Open Library API.
 Usage:
     .venv/bin/python lookup_isbn_ol.py 9780670016907
 """
-import json
+import asyncio
 import sys
 
 import httpx
+import orjson
 
+_ISBN_STRIP = str.maketrans("", "", "- ")
 
-def lookup(isbn: str) -> None:
-    isbn = isbn.replace("-", "").replace(" ", "").strip()
+
+async def lookup(isbn: str) -> None:
+    isbn = isbn.translate(_ISBN_STRIP).strip()
     headers = {"User-Agent": "BookLog/1.0 (lookup script)"}
 
-    resp = httpx.get(
-        f"https://openlibrary.org/isbn/{isbn}.json",
-        headers=headers,
-        timeout=15.0,
-        follow_redirects=True,
-    )
-
-    if resp.status_code == 404:
-        print(f"No result found for ISBN {isbn} on Open Library")
-        return
-
-    resp.raise_for_status()
-    data = resp.json()
-
-    # Resolve author names
-    authors_raw = data.get("authors") or []
-    author_keys = [a.get("key") for a in authors_raw if isinstance(a, dict) and a.get("key")]
-    resolved_authors = []
-    for key in author_keys[:5]:
-        try:
-            a_resp = httpx.get(
-                f"https://openlibrary.org{key}.json",
-                headers=headers,
-                timeout=15.0,
-                follow_redirects=True,
-            )
-            if a_resp.status_code == 200:
-                resolved_authors.append(a_resp.json())
-        except Exception:
-            pass
+    # One client so the edition and author requests share a connection (multiplexed over HTTP/2)
+    async with httpx.AsyncClient(http2=True, headers=headers, timeout=15.0, follow_redirects=True) as client:
+        resp = await client.get(f"https://openlibrary.org/isbn/{isbn}.json")
+
+        if resp.status_code == 404:
+            print(f"No result found for ISBN {isbn} on Open Library")
+            return
+
+        resp.raise_for_status()
+        data = orjson.loads(resp.content)
+
+        # Resolve author names concurrently; a failed author lookup is just left out
+        authors_raw = data.get("authors") or []
+        author_keys = [a.get("key") for a in authors_raw if isinstance(a, dict) and a.get("key")]
+        responses = await asyncio.gather(
+            *(client.get(f"https://openlibrary.org{key}.json") for key in author_keys[:5]),
+            return_exceptions=True,
+        )
+        resolved_authors = [
+            orjson.loads(r.content) for r in responses
+            if isinstance(r, httpx.Response) and r.status_code == 200
+        ]
 
     print("=== Edition ===")
-    print(json.dumps(data, indent=2, ensure_ascii=False))
+    print(orjson.dumps(data, option=orjson.OPT_INDENT_2).decode())
 
     if resolved_authors:
         print("\n=== Authors ===")
-        print(json.dumps(resolved_authors, indent=2, ensure_ascii=False))
+        print(orjson.dumps(resolved_authors, option=orjson.OPT_INDENT_2).decode())
 
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
         print("Usage: python lookup_isbn_ol.py <isbn>")
         sys.exit(1)
-    lookup(sys.argv[1])
+    asyncio.run(lookup(sys.argv[1]))
@@ -11,20 +11,47 @@ Usage:
 Optional env vars:
     GOOGLE_BOOKS_API_KEY  — set to avoid rate limiting
     DRY_RUN=1             — print what would be updated without writing to DB
+    MIGRATE_CONCURRENCY   — max lookups in flight at once (default 16)
+    MIGRATE_RATE          — max Google Books requests per second (default 5)
+    GB_CACHE_PATH         — on-disk cache of Google Books results (default .gb_cache)
+    FORCE_REFRESH=1       — ignore cached results and re-fetch every ISBN
+    FORCE=1               — also migrate books already migrated from Google Books
 """
 import asyncio
+import itertools
+import logging
 import os
+import random
+import shelve
 import sys
+import time
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
 
 import httpx
-from motor.motor_asyncio import AsyncIOMotorClient
+import orjson
+from aiolimiter import AsyncLimiter
 
 MONGODB_URI = os.environ.get("MONGODB_URI", "").strip()
 GOOGLE_BOOKS_API_KEY = os.environ.get("GOOGLE_BOOKS_API_KEY", "").strip()
 DRY_RUN = os.environ.get("DRY_RUN", "").strip() == "1"
+MIGRATE_CONCURRENCY = int(os.environ.get("MIGRATE_CONCURRENCY", "").strip() or 16)
+MIGRATE_RATE = float(os.environ.get("MIGRATE_RATE", "").strip() or 5)
+WRITE_BATCH_SIZE = 200
+GB_CACHE_PATH = os.environ.get("GB_CACHE_PATH", "").strip() or ".gb_cache"
+FORCE_REFRESH = os.environ.get("FORCE_REFRESH", "").strip() == "1"
+FORCE = os.environ.get("FORCE", "").strip() == "1"
+METADATA_SOURCE = "google_books"
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+MAX_RETRIES = 5
+NEGATIVE_CACHE_TTL = 24 * 60 * 60  # re-check "no results" ISBNs after a day; hits are kept until FORCE_REFRESH
 
-METADATA_FIELDS = ("title", "authors", "publishers", "publish_date",
-                   "number_of_pages", "cover_url", "subjects", "description")
+logger = logging.getLogger("migrate_to_google_books")
+
+METADATA_FIELDS = frozenset(("title", "authors", "publishers", "publish_date",
+                             "number_of_pages", "cover_url", "subjects", "description"))
 
 
 def _google_books_url(isbn: str) -> str:
@@ -34,6 +61,18 @@ def _google_books_url(isbn: str) -> str:
     return url
 
 
+def _metadata_update(metadata: dict) -> dict:
+    """Update document for metadata: $set the known fields that have values, $unset the ones Google left empty."""
+    set_part = {k: v for k, v in metadata.items() if k in METADATA_FIELDS and v is not None}
+    set_part["metadata_source"] = METADATA_SOURCE
+    set_part["metadata_fetched_at"] = datetime.now(timezone.utc)
+    update = {"$set": set_part}
+    unset_part = {k: "" for k in METADATA_FIELDS if metadata.get(k) is None}
+    if unset_part:
+        update["$unset"] = unset_part
+    return update
+
+
 def _extract_metadata(item: dict, isbn: str) -> dict | None:
     vi = item.get("volumeInfo") or {}
     title = vi.get("title", "Unknown") or "Unknown"
@@ -42,7 +81,7 @@ def _extract_metadata(item: dict, isbn: str) -> dict | None:
     publishers = [publisher] if publisher else []
     image_links = vi.get("imageLinks") or {}
     thumbnail = image_links.get("thumbnail") or image_links.get("smallThumbnail")
-    if thumbnail and thumbnail.startswith("http:"):
+    if thumbnail is not None and thumbnail[:5] == "http:":
         thumbnail = "https:" + thumbnail[5:]
     categories = list(vi.get("categories") or [])
     page_count = vi.get("pageCount")
@@ -64,78 +103,178 @@ def _extract_metadata(item: dict, isbn: str) -> dict | None:
     }
 
 
-async def fetch_google_books(client: httpx.AsyncClient, isbn: str) -> dict | None:
+def _retry_delay(resp: httpx.Response, attempt: int) -> float:
+    """Seconds to wait before retrying: the server's Retry-After when given, else capped exponential backoff with jitter."""
+    retry_after = resp.headers.get("Retry-After", "").strip()
+    if retry_after.isdigit():
+        return min(float(retry_after), 60.0)
+    return min(2 ** attempt, 30) + random.uniform(0, 1)
+
+
+async def fetch_google_books(client: httpx.AsyncClient, isbn: str, cache=None, limiter=None) -> dict | None:
+    """Metadata for isbn, or None. Results are remembered in cache (a shelf of isbn -> (fetched_at, raw item))
+    so re-runs skip the API; HTTP errors are never cached. The raw Google Books item is stored rather than
+    extracted metadata, so changes to _extract_metadata apply to cached results too.
+    Only actual requests take a limiter slot.
+    Rate-limit (429) and transient server errors are retried up to MAX_RETRIES times."""
+    if cache is not None and not FORCE_REFRESH:
+        entry = cache.get(isbn)
+        if entry is not None:
+            fetched_at, item = entry
+            if item is not None:
+                return _extract_metadata(item, isbn)
+            if time.time() - fetched_at < NEGATIVE_CACHE_TTL:
+                return None
     try:
-        resp = await client.get(_google_books_url(isbn), timeout=15.0)
+        for attempt in range(MAX_RETRIES + 1):
+            async with limiter or nullcontext():
+                resp = await client.get(_google_books_url(isbn))
+            if resp.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+                break
+            delay = _retry_delay(resp, attempt)
+            logger.warning("  [retry] %s: HTTP %s, waiting %.1fs", isbn, resp.status_code, delay)
+            await asyncio.sleep(delay)
         if resp.status_code != 200:
             return None
-        data = resp.json()
+        data = orjson.loads(resp.content)
         items = data.get("items") or []
-        if not items:
-            return None
-        return _extract_metadata(items[0], isbn)
+        item = items[0] if items else None
     except Exception as e:
-        print(f"  [error] HTTP error for {isbn}: {e}")
+        logger.error("  [error] HTTP error for %s: %s", isbn, e)
         return None
+    if cache is not None:
+        cache[isbn] = (time.time(), item)
+    return _extract_metadata(item, isbn) if item is not None else None
+
+
+def _start_logging() -> QueueListener:
+    """Send progress output through a queue drained by a background thread, so workers never block on stdout."""
+    records: SimpleQueue = SimpleQueue()
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(QueueHandler(records))
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    listener = QueueListener(records, handler)
+    listener.start()
+    return listener
 
 
 async def main():
-    if not MONGODB_URI:
-        print("Error: MONGODB_URI environment variable is not set.")
-        sys.exit(1)
+    # Imported here so a misconfigured run exits before paying for motor/pymongo
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from pymongo import UpdateOne
 
     if DRY_RUN:
-        print("=== DRY RUN — no changes will be written ===\n")
+        logger.info("=== DRY RUN — no changes will be written ===\n")
 
     client_mongo = AsyncIOMotorClient(MONGODB_URI)
     coll = client_mongo["booklog"]["books"]
 
-    # Fetch all ISBNs that are real book ISBNs (not article- entries)
-    cursor = coll.find(
-        {"isbn": {"$not": {"$regex": "^article-"}}},
-        projection={"isbn": 1},
-    )
-    isbn_list = [doc["isbn"] async for doc in cursor]
-
-    total = len(isbn_list)
-    print(f"Found {total} book ISBN(s) to migrate.\n")
+    # Real book ISBNs only (not article- entries). Counted up front for progress output;
+    # the ISBNs themselves are streamed from the cursor below
+    books_filter = {"isbn": {"$not": {"$regex": "^article-"}}}
+    if not FORCE:
+        # Skip books an earlier run already migrated (unless their title never resolved)
+        books_filter["$or"] = [
+            {"title": {"$in": [None, "Unknown"]}},
+            {"metadata_source": {"$ne": METADATA_SOURCE}},
+        ]
+    total = await coll.count_documents(books_filter)
+    logger.info("Found %d book ISBN(s) to migrate.\n", total)
 
     if total == 0:
-        print("Nothing to do.")
+        logger.info("Nothing to do.")
         return
 
     updated = 0
     skipped = 0
     failed = 0
 
+    # MIGRATE_CONCURRENCY workers consume ISBNs that a producer streams off the cursor, so lookups
+    # start with the first batch and memory is bounded by the queue, not the collection size.
+    # The token bucket keeps the request rate polite to the API (replaces a fixed sleep between lookups)
+    queue: asyncio.Queue[str | None] = asyncio.Queue(maxsize=2 * MIGRATE_CONCURRENCY)
+    limiter = AsyncLimiter(MIGRATE_RATE, 1)
+    done = itertools.count(1)
+
+    async def produce() -> None:
+        cursor = coll.find(books_filter, projection={"isbn": 1}).batch_size(500)
+        async for doc in cursor:
+            await queue.put(doc["isbn"])
+        for _ in range(MIGRATE_CONCURRENCY):
+            await queue.put(None)  # one stop marker per worker
+
+    # Updates are buffered and sent as unordered bulk writes instead of one round trip per book
+    pending: list[UpdateOne] = []
+
+    async def flush() -> None:
+        nonlocal pending
+        if not pending:
+            return
+        ops, pending = pending, []
+        await coll.bulk_write(ops, ordered=False)
+        logger.info("  wrote %d update(s)", len(ops))
+
+    async def process(isbn: str) -> None:
+        nonlocal updated, skipped
+        metadata = await fetch_google_books(http, isbn, cache, limiter)
+        if metadata is None:
+            logger.info("[%d/%d] %s NOT FOUND on Google Books — skipped", next(done), total, isbn)
+            skipped += 1
+            return
+
+        status = "(dry run)" if DRY_RUN else "✓ queued"
+        logger.info("[%d/%d] %s → \"%s\" %s", next(done), total, isbn, metadata["title"], status)
+        updated += 1
+        if not DRY_RUN:
+            pending.append(UpdateOne({"isbn": isbn}, _metadata_update(metadata)))
+            if len(pending) >= WRITE_BATCH_SIZE:
+                await flush()
+
+    async def worker() -> None:
+        while (isbn := await queue.get()) is not None:
+            await process(isbn)
+
     headers = {"User-Agent": "BookLog/1.0 (migration script)"}
-    async with httpx.AsyncClient(follow_redirects=True, headers=headers) as http:
-        for i, isbn in enumerate(isbn_list, 1):
-            print(f"[{i}/{total}] {isbn} ...", end=" ", flush=True)
-            metadata = await fetch_google_books(http, isbn)
-            if metadata is None:
-                print("NOT FOUND on Google Books — skipped")
-                skipped += 1
-                continue
-
-            print(f"→ \"{metadata['title']}\"", end=" ")
-            if DRY_RUN:
-                print("(dry run)")
-            else:
-                await coll.update_one(
-                    {"isbn": isbn},
-                    {"$set": metadata},
-                )
-                print("✓ updated")
-            updated += 1
-
-            # Small delay to be polite to the API
-            await asyncio.sleep(0.3)
-
-    print(f"\nDone. {updated} updated, {skipped} not found on Google Books, {failed} errors.")
+    # Pool sized to the fan-out so no lookup waits for a connection; HTTP/2 multiplexes them
+    # over one TLS session to googleapis.com
+    limits = httpx.Limits(
+        max_connections=MIGRATE_CONCURRENCY,
+        max_keepalive_connections=MIGRATE_CONCURRENCY,
+        keepalive_expiry=30.0,
+    )
+    async with httpx.AsyncClient(
+        follow_redirects=True,
+        headers=headers,
+        limits=limits,
+        http2=True,
+        timeout=httpx.Timeout(15.0, connect=5.0),
+    ) as http:
+        # Shelf is a plain (sync) context manager, so it can't join the async with above
+        with shelve.open(GB_CACHE_PATH) as cache:
+            try:
+                # A failing worker cancels the producer and the other workers instead of leaving
+                # the producer blocked on a full queue
+                async with asyncio.TaskGroup() as tg:
+                    tg.create_task(produce())
+                    for _ in range(MIGRATE_CONCURRENCY):
+                        tg.create_task(worker())
+            finally:
+                # Persist whatever was fetched even if the run is interrupted
+                await flush()
+
+    logger.info("\nDone. %d updated, %d not found on Google Books, %d errors.", updated, skipped, failed)
     if DRY_RUN:
-        print("(Dry run — no changes were written to MongoDB.)")
+        logger.info("(Dry run — no changes were written to MongoDB.)")
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    if not MONGODB_URI:
+        print("Error: MONGODB_URI environment variable is not set.")
+        sys.exit(1)
+    listener = _start_logging()
+    try:
+        asyncio.run(main())
+    finally:
+        listener.stop()  # drains any queued progress lines
@@ -4,5 +4,15 @@ import os
 os.environ.pop("MONGODB_URI", None)
 
 import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
 
 pytest_plugins = ["pytest_asyncio"]
+
+
+@pytest.fixture(scope="session")
+def client():
+    """One TestClient for the whole session, so app startup/shutdown runs once instead of per test."""
+    with TestClient(app) as c:
+        yield c
@@ -12,18 +12,14 @@ app always calls the external APIs (no cache). This keeps tests hitting the
 real services every time.
 """
 import pytest
-from fastapi.testclient import TestClient
-
-from app.main import app
 
 # ISBN well-covered by Google Books
 LIVE_ISBN_GOOGLE = "9781685781347"
 
 
 @pytest.mark.integration
-def test_get_book_by_isbn_live_google():
+def test_get_book_by_isbn_live_google(client):
     """GET /api/books/isbn/{isbn} against live Google Books returns our schema with real data."""
-    client = TestClient(app)
     response = client.get(f"/api/books/isbn/{LIVE_ISBN_GOOGLE}")
 
     if response.status_code == 404:
@@ -46,9 +42,8 @@ def test_get_book_by_isbn_live_google():
 
 
 @pytest.mark.integration
-def test_get_book_by_isbn_live_not_found():
+def test_get_book_by_isbn_live_not_found(client):
     """Unknown ISBN returns 404 when Google Books has no result."""
-    client = TestClient(app)
     response = client.get("/api/books/isbn/0000000000000")
 
     assert response.status_code == 404
@@ -0,0 +1,116 @@
+"""
+Unit tests for app.db helpers that don't need a live MongoDB (collections are mocked).
+"""
+from datetime import date, datetime
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from pymongo.errors import PyMongoError
+
+from app import db
+
+
+class _FakeCursor:
+    """Async-iterable stand-in for a Motor cursor over a fixed list of docs."""
+
+    def __init__(self, docs: list[dict]):
+        self._docs = iter(docs)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._docs)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+@pytest.fixture
+def collections(monkeypatch):
+    """Mocked books and progress_events collections; the books collection holds one legacy doc."""
+    books = MagicMock()
+    books.find = MagicMock(side_effect=lambda *a, **kw: _FakeCursor([{
+        "_id": "oid1",
+        "isbn": "9780670016907",
+        "progress_events": [
+            {"date": datetime(2024, 5, 1), "delta": 20},
+            {"date": "2024-05-02", "delta": 15},
+            {"date": "not a date", "delta": 5},
+            {"date": datetime(2024, 5, 3), "delta": 0},
+        ],
+    }]))
+    books.update_one = AsyncMock()
+    progress = MagicMock()
+    progress.bulk_write = AsyncMock()
+    monkeypatch.setattr(db, "_get_collection", lambda: books)
+    monkeypatch.setattr(db, "_get_progress_collection", lambda: progress)
+    monkeypatch.setattr(db, "_progress_migrated", False)
+    return books, progress
+
+
+@pytest.mark.asyncio
+async def test_migrate_embedded_progress_events_moves_valid_events(collections):
+    """Valid embedded events are upserted with deterministic ids and the embedded array is removed."""
+    books, progress = collections
+
+    await db._migrate_embedded_progress_events()
+
+    (ops,), kwargs = progress.bulk_write.call_args
+    assert kwargs == {"ordered": False}
+    assert [op._filter for op in ops] == [{"_id": "9780670016907:0"}, {"_id": "9780670016907:1"}]
+    assert ops[1]._doc == {"$setOnInsert": {"isbn": "9780670016907", "date": datetime(2024, 5, 2), "delta": 15}}
+    books.update_one.assert_awaited_once_with({"_id": "oid1"}, {"$unset": {"progress_events": ""}})
+
+
+@pytest.mark.asyncio
+async def test_progress_migration_is_retried_until_it_succeeds(collections):
+    """A failed migration (e.g. Mongo not ready at startup) runs again on the next stats read, then never again."""
+    _, progress = collections
+    progress.bulk_write.side_effect = [PyMongoError("not ready"), None]
+
+    with pytest.raises(PyMongoError):
+        await db.ensure_progress_events_migrated()
+    assert db._progress_migrated is False
+
+    await db.ensure_progress_events_migrated()
+    assert db._progress_migrated is True
+
+    await db.ensure_progress_events_migrated()
+    assert progress.bulk_write.await_count == 2
+
+
+def test_doc_to_book_normalizes_string_dates():
+    """Rows written before dates were stored as datetimes still come back as dates."""
+    book = db._doc_to_book({
+        "_id": "oid1",
+        "isbn": "9780670016907",
+        "title": "Test",
+        "started_date": "2024-05-01T00:00:00",
+        "finished_date": datetime(2024, 5, 9),
+        "backlog_date": "garbage",
+    })
+    assert book.started_date == date(2024, 5, 1)
+    assert book.finished_date == date(2024, 5, 9)
+    assert book.backlog_date is None
+
+
+@pytest.mark.asyncio
+async def test_calendar_overrides_cache_expires(monkeypatch):
+    """Overrides written by another worker show up once the in-memory copy is older than the TTL."""
+    settings = MagicMock()
+    settings.find_one = AsyncMock(side_effect=[
+        {"_id": "calendar_overrides", "overrides": {"2024-05-01": True}},
+        {"_id": "calendar_overrides", "overrides": {"2024-05-01": False}},
+    ])
+    monkeypatch.setattr(db, "_get_settings_collection", lambda: settings)
+    monkeypatch.setattr(db, "_overrides_cache", None)
+    now = [1000.0]
+    monkeypatch.setattr(db, "monotonic", lambda: now[0])
+
+    assert await db.get_calendar_overrides() == {"2024-05-01": True}
+    now[0] += db._OVERRIDES_TTL_SECONDS / 2
+    assert await db.get_calendar_overrides() == {"2024-05-01": True}
+    now[0] += db._OVERRIDES_TTL_SECONDS
+    assert await db.get_calendar_overrides() == {"2024-05-01": False}
+    assert settings.find_one.await_count == 2
@@ -2,12 +2,14 @@
 Unit tests for the book lookup API.
 Google Books is the primary source; Open Library is mocked where needed as a supplement.
 """
-from unittest.mock import AsyncMock, MagicMock, patch
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
 
+import httpx
 import pytest
-from fastapi.testclient import TestClient
 
-from app.main import app
+from app.main import _book_cache, _book_from_google_books, _google_books_url, app, get_http_client
+from app.models import BookResponse
 
 # Google Books response for ISBN 9780670016907 (The Grapes of Wrath) — full data
 GOOGLE_BOOKS_GRAPES_RESPONSE = {
@@ -49,37 +51,62 @@ GOOGLE_BOOKS_ZERO_PAGES_RESPONSE = {
 OPEN_LIBRARY_PAGE_COUNT_RESPONSE = {"number_of_pages": 512}
 
 
-def _make_response(status_code: int, json_data: dict):
-    resp = MagicMock()
-    resp.status_code = status_code
-    resp.json = MagicMock(return_value=json_data)
-    resp.raise_for_status = MagicMock()
-    if status_code >= 400:
-        resp.raise_for_status.side_effect = Exception("HTTP error")
-    return resp
+class _FakeResp:
+    """Minimal stand-in for httpx.Response (plain attributes, no MagicMock overhead)."""
+    __slots__ = ("status_code", "_json")
 
+    def __init__(self, status_code: int, json_data: dict):
+        self.status_code = status_code
+        self._json = json_data
 
-def _mock_async_client(isbn: str, volume_response: dict):
-    """Mock client: Google Books returns the given volume; Open Library returns 404."""
+    def json(self):
+        return self._json
 
-    async def mock_get(url: str, *args, **kwargs):
-        if "googleapis.com" in url and isbn in url:
-            return _make_response(200, {"totalItems": 1, "items": [volume_response]})
-        return _make_response(404, {})
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise Exception("HTTP error")
 
+
+# Canned responses, built once and returned as-is by the mocked clients
+_GB_GRAPES = _FakeResp(200, {"totalItems": 1, "items": [GOOGLE_BOOKS_GRAPES_RESPONSE]})
+_GB_ZERO_PAGES = _FakeResp(200, {"totalItems": 1, "items": [GOOGLE_BOOKS_ZERO_PAGES_RESPONSE]})
+_GB_NO_RESULTS = _FakeResp(200, {"totalItems": 0, "items": []})
+_OL_PAGE_COUNT = _FakeResp(200, OPEN_LIBRARY_PAGE_COUNT_RESPONSE)
+_NOT_FOUND = _FakeResp(404, {})
+
+
+def _ol_isbn_url(isbn: str) -> str:
+    return f"https://openlibrary.org/isbn/{isbn}.json"
+
+
+def _mock_async_client(responses: dict[str, _FakeResp]):
+    """Mock client: exact request URL -> canned response; any other URL returns 404."""
     mock_instance = MagicMock()
-    mock_instance.__aenter__ = AsyncMock(return_value=mock_instance)
-    mock_instance.__aexit__ = AsyncMock(return_value=None)
-    mock_instance.get = AsyncMock(side_effect=mock_get)
+    mock_instance.get = AsyncMock(side_effect=lambda url, *args, **kwargs: responses.get(url, _NOT_FOUND))
     return mock_instance
 
 
-@patch("app.main.httpx.AsyncClient")
-def test_get_book_by_isbn_returns_transformed_book(MockAsyncClient):
+@pytest.fixture
+def use_http_client():
+    """Route the app's outbound HTTP through the given mock client for one test."""
+
+    def use(mock_client):
+        app.dependency_overrides[get_http_client] = lambda: mock_client
+
+    yield use
+    app.dependency_overrides.pop(get_http_client, None)
+
+
+@pytest.fixture(scope="module")
+def google_mock():
+    """Mock client serving The Grapes of Wrath from Google Books; built once for the tests that use it."""
+    return _mock_async_client({_google_books_url("9780670016907"): _GB_GRAPES})
+
+
+def test_get_book_by_isbn_returns_transformed_book(client, use_http_client, google_mock):
     """GET /api/books/isbn/{isbn} with mocked Google Books returns our schema."""
-    MockAsyncClient.return_value = _mock_async_client("9780670016907", GOOGLE_BOOKS_GRAPES_RESPONSE)
+    use_http_client(google_mock)
 
-    client = TestClient(app)
     response = client.get("/api/books/isbn/9780670016907")
 
     assert response.status_code == 200
@@ -95,59 +122,34 @@ def test_get_book_by_isbn_returns_transformed_book(MockAsyncClient):
     assert "Pulitzer" in (data["description"] or "")
 
 
-@patch("app.main.httpx.AsyncClient")
-def test_get_book_by_isbn_normalizes_isbn(MockAsyncClient):
+def test_get_book_by_isbn_normalizes_isbn(client, use_http_client, google_mock):
     """ISBN with spaces/dashes is normalized before lookup."""
-    MockAsyncClient.return_value = _mock_async_client("9780670016907", GOOGLE_BOOKS_GRAPES_RESPONSE)
+    use_http_client(google_mock)
 
-    client = TestClient(app)
     response = client.get("/api/books/isbn/978-0670-01690-7")
 
     assert response.status_code == 200
     assert response.json()["isbn"] == "9780670016907"
 
 
-@patch("app.main.httpx.AsyncClient")
-def test_get_book_by_isbn_not_found(MockAsyncClient):
+def test_get_book_by_isbn_not_found(client, use_http_client):
     """Unknown ISBN returns 404 when Google Books has no result."""
+    use_http_client(_mock_async_client({_google_books_url("9999999999999"): _GB_NO_RESULTS}))
 
-    async def mock_get(url: str, *args, **kwargs):
-        if "googleapis.com" in url:
-            return _make_response(200, {"totalItems": 0, "items": []})
-        return _make_response(404, {})
-
-    mock_instance = MagicMock()
-    mock_instance.__aenter__ = AsyncMock(return_value=mock_instance)
-    mock_instance.__aexit__ = AsyncMock(return_value=None)
-    mock_instance.get = AsyncMock(side_effect=mock_get)
-    MockAsyncClient.return_value = mock_instance
-
-    client = TestClient(app)
     response = client.get("/api/books/isbn/9999999999999")
 
     assert response.status_code == 404
     assert "not found" in response.json()["detail"].lower()
 
 
-@patch("app.main.httpx.AsyncClient")
-def test_get_book_by_isbn_ol_supplements_zero_page_count(MockAsyncClient):
+def test_get_book_by_isbn_ol_supplements_zero_page_count(client, use_http_client):
     """When Google Books returns pageCount=0, the page count is patched from Open Library."""
     isbn = "9781685781347"
+    use_http_client(_mock_async_client({
+        _google_books_url(isbn): _GB_ZERO_PAGES,
+        _ol_isbn_url(isbn): _OL_PAGE_COUNT,
+    }))
 
-    async def mock_get(url: str, *args, **kwargs):
-        if "googleapis.com" in url:
-            return _make_response(200, {"totalItems": 1, "items": [GOOGLE_BOOKS_ZERO_PAGES_RESPONSE]})
-        if f"openlibrary.org/isbn/{isbn}.json" in url:
-            return _make_response(200, OPEN_LIBRARY_PAGE_COUNT_RESPONSE)
-        return _make_response(404, {})
-
-    mock_instance = MagicMock()
-    mock_instance.__aenter__ = AsyncMock(return_value=mock_instance)
-    mock_instance.__aexit__ = AsyncMock(return_value=None)
-    mock_instance.get = AsyncMock(side_effect=mock_get)
-    MockAsyncClient.return_value = mock_instance
-
-    client = TestClient(app)
     response = client.get(f"/api/books/isbn/{isbn}")
 
     assert response.status_code == 200
@@ -160,23 +162,11 @@ def test_get_book_by_isbn_ol_supplements_zero_page_count(MockAsyncClient):
     assert data["number_of_pages"] == 512
 
 
-@patch("app.main.httpx.AsyncClient")
-def test_get_book_by_isbn_keeps_google_page_count_when_ol_unavailable(MockAsyncClient):
+def test_get_book_by_isbn_keeps_google_page_count_when_ol_unavailable(client, use_http_client):
     """When Google returns pageCount=0 and OL has no data, number_of_pages stays 0."""
     isbn = "9781685781347"
+    use_http_client(_mock_async_client({_google_books_url(isbn): _GB_ZERO_PAGES}))
 
-    async def mock_get(url: str, *args, **kwargs):
-        if "googleapis.com" in url:
-            return _make_response(200, {"totalItems": 1, "items": [GOOGLE_BOOKS_ZERO_PAGES_RESPONSE]})
-        return _make_response(404, {})
-
-    mock_instance = MagicMock()
-    mock_instance.__aenter__ = AsyncMock(return_value=mock_instance)
-    mock_instance.__aexit__ = AsyncMock(return_value=None)
-    mock_instance.get = AsyncMock(side_effect=mock_get)
-    MockAsyncClient.return_value = mock_instance
-
-    client = TestClient(app)
     response = client.get(f"/api/books/isbn/{isbn}")
 
     assert response.status_code == 200
@@ -184,10 +174,95 @@ def test_get_book_by_isbn_keeps_google_page_count_when_ol_unavailable(MockAsyncC
     assert data["number_of_pages"] == 0
 
 
-def test_get_book_by_isbn_invalid_isbn():
+def test_get_book_by_isbn_invalid_isbn(client):
     """Invalid ISBN (non-digits) returns 400."""
-    client = TestClient(app)
     response = client.get("/api/books/isbn/not-an-isbn")
 
     assert response.status_code == 400
     assert "invalid" in response.json()["detail"].lower()
+
+
+def test_get_book_by_isbn_invalid_length(client):
+    """Digit strings that are neither 10 nor 13 long are rejected before any lookup."""
+    response = client.get("/api/books/isbn/12345")
+
+    assert response.status_code == 400
+    assert "invalid" in response.json()["detail"].lower()
+
+
+def test_google_books_mapping_matches_book_response_schema():
+    """_book_from_google_books output is stored via model_construct, so it must already be a valid BookResponse."""
+    for volume in (GOOGLE_BOOKS_GRAPES_RESPONSE, GOOGLE_BOOKS_ZERO_PAGES_RESPONSE, {}):
+        result = _book_from_google_books(volume, "9780670016907")
+
+        assert set(result) <= set(BookResponse.model_fields)
+        validated = BookResponse.model_validate(result)
+        assert BookResponse.model_construct(**result).model_dump() == validated.model_dump()
+
+
+@pytest.mark.parametrize("path", ["/api/books/history", "/api/books/backlog", "/api/books/in-progress", "/api/books/finished"])
+def test_list_endpoints_return_empty_array_when_db_disabled(client, path):
+    """List endpoints stream from Mongo; with no DB configured they return an empty JSON array."""
+    response = client.get(path)
+
+    assert response.status_code == 200
+    assert response.json() == []
+
+
+def test_list_backlog_streams_every_row(client, monkeypatch):
+    """Rows from the cursor are encoded as one JSON array, in cursor order."""
+    async def fake_iter_backlog():
+        for i, title in enumerate(("First", "Second", "Third")):
+            yield BookResponse(isbn=f"978067001690{i}", title=title, status="backlog", backlog_order=i)
+
+    monkeypatch.setattr("app.main.db.iter_backlog", fake_iter_backlog)
+
+    response = client.get("/api/books/backlog")
+
+    assert response.status_code == 200
+    assert [(b["title"], b["backlog_order"]) for b in response.json()] == [("First", 0), ("Second", 1), ("Third", 2)]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_lookups_share_one_google_books_request(use_http_client):
+    """Concurrent requests for the same uncached ISBN wait on a single external fetch."""
+    gb_url = _google_books_url("9780670016907")
+
+    async def slow_get(url, *args, **kwargs):
+        await asyncio.sleep(0.05)  # keep the first fetch in flight while the second request arrives
+        return _GB_GRAPES if url == gb_url else _NOT_FOUND
+
+    mock_client = MagicMock()
+    mock_client.get = AsyncMock(side_effect=slow_get)
+    use_http_client(mock_client)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+        first, second = await asyncio.gather(
+            ac.get("/api/books/isbn/9780670016907"),
+            ac.get("/api/books/isbn/9780670016907"),
+        )
+
+    assert first.status_code == second.status_code == 200
+    assert first.json() == second.json()
+    assert [c.args[0] for c in mock_client.get.call_args_list].count(gb_url) == 1
+
+
+def test_patch_is_visible_on_next_get(client, monkeypatch):
+    """A PATCH drops the cached lookup, so the next GET reflects it instead of serving stale bytes."""
+    stored = {"book": BookResponse(isbn="9780670016907", title="Old Title")}
+
+    async def fake_update_book(isbn, update):
+        stored["book"] = stored["book"].model_copy(update=update.model_dump(exclude_unset=True))
+        return stored["book"]
+
+    monkeypatch.setattr("app.main.db.is_db_enabled", lambda: True)
+    monkeypatch.setattr("app.main.db.get_book_by_isbn", AsyncMock(side_effect=lambda isbn: stored["book"]))
+    monkeypatch.setattr("app.main.db.update_book", fake_update_book)
+    monkeypatch.setattr("app.main.db.touch_book_last_looked_up", AsyncMock())
+    _book_cache.clear()
+
+    assert client.get("/api/books/isbn/9780670016907").json()["title"] == "Old Title"
+    assert client.patch("/api/books/9780670016907", json={"title": "New Title"}).status_code == 200
+    assert client.get("/api/books/isbn/9780670016907").json()["title"] == "New Title"
+    _book_cache.clear()
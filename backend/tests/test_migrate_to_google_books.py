@@ -0,0 +1,85 @@
+"""
+Tests for the Google Books migration script. MongoDB is faked and Google Books is served by an httpx.MockTransport.
+"""
+import functools
+from unittest.mock import AsyncMock, MagicMock
+
+import httpx
+import pytest
+
+import migrate_to_google_books as migrate
+
+_FOUND_ISBN = "9780670016907"
+_MISSING_ISBN = "9780000000002"
+
+
+class _FakeCursor:
+    """Async-iterable stand-in for a Motor cursor over a fixed list of docs."""
+
+    def __init__(self, docs: list[dict]):
+        self._docs = iter(docs)
+
+    def batch_size(self, n: int):
+        return self
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._docs)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+@pytest.fixture
+def books(monkeypatch, tmp_path):
+    """Fake books collection holding two ISBNs, wired into main() along with a temporary cache shelf."""
+    docs = [{"isbn": _FOUND_ISBN}, {"isbn": _MISSING_ISBN}]
+    coll = MagicMock()
+    coll.count_documents = AsyncMock(return_value=len(docs))
+    coll.find = MagicMock(side_effect=lambda *a, **kw: _FakeCursor(docs))
+    coll.bulk_write = AsyncMock()
+    mongo = MagicMock()
+    mongo.__getitem__.return_value.__getitem__.return_value = coll
+    monkeypatch.setattr("motor.motor_asyncio.AsyncIOMotorClient", lambda uri: mongo)
+    monkeypatch.setattr(migrate, "GB_CACHE_PATH", str(tmp_path / "gb_cache"))
+    monkeypatch.setattr(migrate, "DRY_RUN", False)
+    monkeypatch.setattr(migrate, "FORCE_REFRESH", False)
+    return coll
+
+
+@pytest.fixture
+def google_requests(monkeypatch):
+    """Serve Google Books from a MockTransport; returns the list of requested ISBNs."""
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        isbn = request.url.params["q"].removeprefix("isbn:")
+        seen.append(isbn)
+        if isbn != _FOUND_ISBN:
+            return httpx.Response(200, json={"totalItems": 0})
+        item = {"volumeInfo": {"title": "The Grapes of Wrath", "authors": ["John Steinbeck"], "pageCount": 496}}
+        return httpx.Response(200, json={"totalItems": 1, "items": [item]})
+
+    transport = httpx.MockTransport(handler)
+    monkeypatch.setattr(migrate.httpx, "AsyncClient", functools.partial(httpx.AsyncClient, transport=transport))
+    return seen
+
+
+@pytest.mark.asyncio
+async def test_migration_runs_and_reruns_from_disk_cache(books, google_requests):
+    """A run writes the found book's metadata; a second run is answered from the shelf without any requests."""
+    await migrate.main()
+
+    assert sorted(google_requests) == sorted([_FOUND_ISBN, _MISSING_ISBN])
+    (ops,), _ = books.bulk_write.call_args
+    assert [op._filter for op in ops] == [{"isbn": _FOUND_ISBN}]
+    assert ops[0]._doc["$set"]["title"] == "The Grapes of Wrath"
+
+    await migrate.main()
+
+    assert len(google_requests) == 2
+    assert books.bulk_write.await_count == 2
+    (ops,), _ = books.bulk_write.call_args
+    assert ops[0]._doc["$set"]["number_of_pages"] == 496